@@ -0,0 +1,98 @@
+"""
+Report the embedding throughput scaling with the number of worker processes.
+
+"""
+
+import time
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import typer
+
+from rich import print
+from rich.table import Table
+
+
+app = typer.Typer(no_args_is_help=False)
+"""Main CLI app to group commands."""
+
+
+@app.command()
+def run(
+    path: Path = Path("data/prepared/"),
+    workers: Optional[list[int]] = None,
+    limit: int = 2000,
+    model: Optional[str] = None,
+) -> None:
+    """
+    Encode the text chunks of the prepared documents with 1, 2, 4 and 8 worker
+    processes and report the throughput, speedup and parallel efficiency.
+
+    Args:
+        path: Path to load documents from.
+        workers: Number of worker processes to measure. Defaults to 1, 2, 4, 8.
+        limit: Maximum number of text chunks to encode.
+        model: Custom HuggingFace sentence-transformers model to use. If not set,
+            use the model of the current index.
+    """
+    from logos.config import Config
+    from logos.data.extract import (
+        load_documents,
+        parse_documents_into_nodes,
+        parse_nodes_into_text_chunks,
+    )
+    from logos.data.index import get_embedding_model, get_index_model_path
+    from logos.data.pool import EmbeddingPool
+
+    Config.MODEL_PATH = model or get_index_model_path()
+    files = sorted(p for p in path.rglob("*") if p.is_file())
+    nodes = parse_documents_into_nodes(
+        load_documents(input_files=files),
+        model_path=Config.MODEL_PATH,
+    )
+    texts = [
+        f"{Config.MODEL_INSTRUCTIONS.data}{chunk.embed_text}"
+        for chunk in parse_nodes_into_text_chunks(nodes)[:limit]
+    ]
+    st_model = get_embedding_model(Config.MODEL_PATH)
+
+    table = Table(title=f"Encoding {len(texts)} chunks with {Config.MODEL_PATH}")
+    for column in ("Workers", "Threads", "Seconds", "Chunks/s", "Speedup", "Eff."):
+        table.add_column(column, justify="right")
+
+    baseline, reference = None, None
+    for n_workers in workers or [1, 2, 4, 8]:
+        if n_workers == 1:
+            start = time.perf_counter()
+            result = st_model.encode(texts)
+            elapsed, threads = time.perf_counter() - start, "all"
+        else:
+            with EmbeddingPool(st_model, Config.MODEL_PATH, n_workers) as pool:
+                pool.encode(texts[: n_workers * 8])  # Warm up the workers
+                start = time.perf_counter()
+                result = pool.encode(texts)
+                elapsed, threads = time.perf_counter() - start, str(pool.threads)
+
+        if reference is None:
+            reference = result
+        elif not np.allclose(reference, result, atol=1e-4):
+            raise RuntimeError(f"Embeddings with {n_workers} workers do not match.")
+
+        baseline = baseline or elapsed
+        speedup = baseline / elapsed
+        table.add_row(
+            str(n_workers),
+            threads,
+            f"{elapsed:.2f}",
+            f"{len(texts) / elapsed:.1f}",
+            f"{speedup:.2f}x",
+            f"{speedup / n_workers:.0%}",
+        )
+
+    print(table)
+
+
+if __name__ == "__main__":
+    app()
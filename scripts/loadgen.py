@@ -0,0 +1,137 @@
+"""
+Generate concurrent load against the search HTTP API and report latencies.
+
+Start the API with `logos serve` before running this script.
+
+"""
+
+import asyncio
+import json
+import random
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from statistics import quantiles
+from typing import Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import typer
+
+from rich import print
+
+
+DEFAULT_QUERIES = [
+    "Como asimilar la enseñanza logosófica?",
+    "Qué es el conocimiento de sí mismo?",
+    "Cómo se forman los pensamientos?",
+    "Cuál es la función de la sensibilidad?",
+    "Qué son las deficiencias psicológicas?",
+    "Cómo cultivar la paciencia?",
+    "Qué es la conciencia?",
+    "Cuál es el papel del afecto en la vida?",
+]
+"""Queries sampled by the load generator when no queries file is provided."""
+
+
+app = typer.Typer(no_args_is_help=False)
+"""Main CLI app to group commands."""
+
+
+def _request(url: str, timeout: float) -> tuple[int, float]:
+    """
+    Perform a GET request and return the status code and its latency.
+    """
+    start = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout) as response:  # noqa: S310
+            response.read()
+            code = response.status
+    except HTTPError as exc:
+        code = exc.code
+    except (URLError, TimeoutError):
+        code = 0
+    return code, time.perf_counter() - start
+
+
+async def _run(  # noqa: PLR0913
+    base_url: str,
+    queries: list[str],
+    requests: int,
+    concurrency: int,
+    limit: int,
+    timeout: float,
+) -> tuple[list[tuple[int, float]], float]:
+    """
+    Send all requests keeping at most `concurrency` of them in flight.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(query: str) -> tuple[int, float]:
+        url = f"{base_url}/search?{urlencode({'query': query, 'limit': limit})}"
+        async with semaphore:
+            return await loop.run_in_executor(executor, _request, url, timeout)
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(send(random.choice(queries)) for _ in range(requests)),  # noqa: S311
+        )
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+@app.command()
+def run(  # noqa: PLR0913
+    url: str = "http://127.0.0.1:8000",
+    requests: int = 500,
+    concurrency: int = 32,
+    limit: int = 10,
+    timeout: float = 30.0,
+    queries_file: Optional[str] = None,
+) -> None:
+    """
+    Send concurrent search requests sampled from a list of queries and report
+    throughput, latency percentiles and the service metrics.
+
+    Args:
+        url: Base URL of the search API.
+        requests: Total number of requests to send.
+        concurrency: Maximum number of requests in flight.
+        limit: Maximum number of results per query.
+        timeout: Client timeout in seconds for each request.
+        queries_file: File with one query per line. If not set, use defaults.
+    """
+    queries = DEFAULT_QUERIES
+    if queries_file:
+        with open(queries_file, encoding="utf-8") as file:  # noqa: PTH123
+            queries = [line.strip() for line in file if line.strip()]
+
+    results, elapsed = asyncio.run(
+        _run(url.rstrip("/"), queries, requests, concurrency, limit, timeout),
+    )
+
+    codes: dict[int, int] = {}
+    for code, _ in results:
+        codes[code] = codes.get(code, 0) + 1
+    latencies = sorted(lat for code, lat in results if code == HTTPStatus.OK)
+
+    print(f"\nRequests: {requests} with concurrency {concurrency}")
+    print(f"Elapsed: {elapsed:.2f}s ({requests / elapsed:.1f} req/s)")
+    print(f"Status codes: {codes}")
+    if len(latencies) > 1:
+        p = quantiles(latencies, n=100, method="inclusive")
+        print(
+            f"Latency (ms): p50={p[49] * 1000:.1f} "
+            f"p95={p[94] * 1000:.1f} p99={p[98] * 1000:.1f}",
+        )
+
+    with urlopen(f"{url.rstrip('/')}/metrics", timeout=timeout) as response:  # noqa: S310
+        print("Service metrics:", json.loads(response.read()))
+
+
+if __name__ == "__main__":
+    app()
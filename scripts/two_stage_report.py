@@ -0,0 +1,144 @@
+"""
+Report the recall and latency of two-stage search against the exact search.
+
+"""
+
+import random
+import time
+
+from pathlib import Path
+from statistics import mean, quantiles
+from typing import Optional
+
+import typer
+
+from logos.config import FirstStageMethod
+from rich import print
+from rich.table import Table
+
+
+app = typer.Typer(no_args_is_help=False)
+"""Main CLI app to group commands."""
+
+
+def _search_all(embeddings: object, queries: list[str], limit: int) -> tuple:
+    """
+    Search all queries one by one, returning the result ids and latencies.
+    """
+    from logos.search.index import search_index
+
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = search_index(query, limit=limit, embeddings=embeddings)
+        latencies.append(time.perf_counter() - start)
+        ids.append([result.text.id for result in results])
+    return ids, latencies
+
+
+@app.command()
+def run(  # noqa: PLR0913
+    path: Path = Path("data/prepared/"),
+    method: FirstStageMethod = FirstStageMethod.binary,
+    dimensions: Optional[int] = None,
+    oversample: int = 10,
+    limit: int = 0,
+    queries: int = 200,
+    k: int = 10,
+    model: Optional[str] = None,
+) -> None:
+    """
+    Index the prepared documents with exact and two-stage search and compare
+    the results of `search_index` for queries sampled from the text chunks.
+
+    Args:
+        path: Path to load documents from.
+        method: Compact vectors of the first stage, `binary` or `pca`.
+        dimensions: Number of dimensions of the compact vectors.
+        oversample: Number of candidates per result retrieved on the first stage.
+        limit: Maximum number of text chunks to index. If 0, index all.
+        queries: Number of queries to sample from the text chunks.
+        k: Number of results per query.
+        model: Custom HuggingFace sentence-transformers model to use. If not set,
+            use the model of the current index.
+    """
+    from logos.config import Config, FirstStageConfig
+    from logos.data.extract import (
+        load_documents,
+        parse_documents_into_nodes,
+        parse_nodes_into_text_chunks,
+    )
+    from logos.data.index import get_index_model_path, open_index
+    from logos.entities.paragraph import ParagraphReference
+
+    Config.MODEL_PATH = model or get_index_model_path()
+    files = sorted(p for p in path.rglob("*") if p.is_file())
+    nodes = parse_documents_into_nodes(
+        load_documents(input_files=files),
+        model_path=Config.MODEL_PATH,
+    )
+    chunks = parse_nodes_into_text_chunks(nodes)[: limit or None]
+
+    # Use the first words of random chunks as queries
+    rng = random.Random(0)  # noqa: S311
+    sampled = rng.sample(chunks, min(queries, len(chunks)))
+    query_texts = [
+        " ".join(ParagraphReference.remove(chunk.text).split()[:12])
+        for chunk in sampled
+    ]
+
+    # Replace the text with the representation prepared for embedding
+    for chunk in chunks:
+        chunk.text = chunk.embed_text
+    documents = [(chunk.id, chunk.model_dump(exclude="id")) for chunk in chunks]
+
+    Config.FIRST_STAGE = None
+    exact = open_index(None)
+    exact.index(documents)
+
+    Config.FIRST_STAGE = FirstStageConfig(
+        method=method,
+        dimensions=dimensions,
+        oversample=oversample,
+    )
+    two_stage = open_index(None)
+    two_stage.index(documents)
+
+    exact_ids, exact_latencies = _search_all(exact, query_texts, k)
+    two_stage_ids, two_stage_latencies = _search_all(two_stage, query_texts, k)
+
+    table = Table(
+        title=(
+            f"{len(query_texts)} queries on {len(chunks)} chunks, "
+            f"first stage {Config.FIRST_STAGE.model_dump(mode='json')}"
+        ),
+    )
+    for column in ("Search", "Recall@k", "Mean ms", "p50 ms", "p95 ms", "Memory MB"):
+        table.add_column(column, justify="right")
+
+    exact_mb = two_stage.ann.vectors.nbytes / 1e6
+    compact_mb = two_stage.ann.compact.nbytes / 1e6
+    for name, ids, latencies, memory in (
+        ("exact", exact_ids, exact_latencies, exact_mb),
+        ("two-stage", two_stage_ids, two_stage_latencies, compact_mb),
+    ):
+        recalls = [
+            len(set(found[:k]) & set(expected[:k])) / max(len(expected[:k]), 1)
+            for found, expected in zip(ids, exact_ids)
+        ]
+        p = quantiles(latencies, n=100, method="inclusive")
+        table.add_row(
+            name,
+            f"{mean(recalls):.3f}",
+            f"{mean(latencies) * 1000:.1f}",
+            f"{p[49] * 1000:.1f}",
+            f"{p[94] * 1000:.1f}",
+            f"{memory:.2f}",
+        )
+
+    print(table)
+    print("Memory is the size of the vectors scanned on the first stage.")
+
+
+if __name__ == "__main__":
+    app()
@@ -12,6 +12,8 @@ import typer
 
 from rich import print
 
+from logos.config import FirstStageMethod
+
 
 simplefilter("ignore", category=FutureWarning)
 
@@ -32,6 +34,9 @@ def index(  # noqa: PLR0913
     reset: bool = False,
     model: Optional[str] = None,
     fast: bool = False,
+    workers: int = 1,
+    first_stage: Optional[FirstStageMethod] = None,
+    first_stage_dims: Optional[int] = None,
 ) -> None:
     """
     Index all files in the provided paths.
@@ -41,7 +46,8 @@ def index(  # noqa: PLR0913
     accept glob patterns.
 
     Note: If the index already exists, it will be updated with the new data.
-    Passing `model` or `fast` will reset the index.
+    Passing `model`, `fast` or `first_stage` will reset the index. The current
+    index keeps being served until the new version is completely saved.
 
     Args:
         paths: List of paths to load documents from.
@@ -51,16 +57,39 @@ def index(  # noqa: PLR0913
         reset: Whether to reset the index before indexing.
         model: Custom HuggingFace sentence-transformers model to use for indexing.
         fast: Whether to use a small model to speed up indexing. Ideal for testing.
+        workers: Number of processes to compute embeddings, each with its own
+            model copy and an equal share of the CPUs.
+        first_stage: Compact vectors to retrieve candidates with, either `binary`
+            or `pca`, which are then rescored with the full vectors. If not set,
+            search is exact.
+        first_stage_dims: Number of dimensions of the compact vectors, either
+            the leading ones for `binary` or the top principal components for
+            `pca`. Defaults to all for `binary` and a quarter for `pca`.
     """
+    if first_stage_dims is not None and first_stage is None:
+        raise typer.BadParameter(
+            "Requires --first-stage.",
+            param_hint="--first-stage-dims",
+        )
+    if first_stage_dims is not None and first_stage_dims <= 0:
+        raise typer.BadParameter(
+            "Must be a positive number.",
+            param_hint="--first-stage-dims",
+        )
+
     print("\n[bold]Initializing...[/bold]")
 
-    from logos.config import Config
+    from logos.config import Config, FirstStageConfig
     from logos.data.extract import (
         load_documents,
         parse_documents_into_nodes,
         parse_nodes_into_text_chunks,
     )
-    from logos.data.index import delete_index, get_or_create_index, index_documents
+    from logos.data.index import (
+        clear_index_cache,
+        get_index_model_path,
+        index_documents,
+    )
 
     paths = [
         rp
@@ -79,17 +108,70 @@ def index(  # noqa: PLR0913
         model_url = f"https://huggingface.co/{Config.MODEL_PATH}"
         model_print = f"[link={model_url}]{Config.MODEL_PATH}[/link]"
         print(f"Using model: [bold yellow]{model_print}[/bold yellow].\n")
-        get_or_create_index.cache_clear()
-    if reset or fast or model:
-        print("Deleting existing index...")
-        delete_index()
+        clear_index_cache()
+    if first_stage:
+        Config.FIRST_STAGE = FirstStageConfig(
+            method=first_stage,
+            dimensions=first_stage_dims,
+        )
+    reset = reset or fast or model or first_stage
+    if reset:
+        print("Rebuilding index from scratch...")
+    else:
+        Config.MODEL_PATH = get_index_model_path()
 
     print("Starting index process...")
     documents = load_documents(input_files=paths)
-    nodes = parse_documents_into_nodes(documents)
+    nodes = parse_documents_into_nodes(documents, model_path=Config.MODEL_PATH)
     text_chunks = parse_nodes_into_text_chunks(nodes)
-    index_documents(text_chunks if not limit else text_chunks[:limit])
-    print("[bold green]All nodes indexed with success.\n")
+    version = index_documents(
+        text_chunks if not limit else text_chunks[:limit],
+        reset=reset,
+        workers=workers,
+    )
+    print(f"[bold green]All nodes indexed with success in version {version}.\n")
+
+
+@app.command()
+def convert(
+    paths: list[Path],
+    *,
+    destination: Path = Path("data/prepared/"),
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> None:
+    """
+    Convert .doc and .docx files into cleaned .txt files ready for indexing.
+
+    Directories will be recursively searched. Each file is written to a folder
+    inside the destination with the same name of the source file parent folder.
+    Files unchanged since the last conversion are skipped.
+
+    Args:
+        paths: List of files or directories to convert.
+        destination: Root path to place the converted .txt files.
+        workers: Number of worker processes. If not set, use all available CPUs.
+        force: Whether to convert all files, even if unchanged.
+    """
+    print("\n[bold]Initializing...[/bold]")
+
+    from logos.data.convert import convert_documents
+
+    written, failed = convert_documents(
+        paths,
+        destination,
+        workers=workers,
+        force=force,
+    )
+    if written:
+        print(f"[bold green]{len(written)} documents converted with success.\n")
+    elif not failed:
+        print("[bold green]All documents are up to date.\n")
+    if failed:
+        print(f"[bold red]{len(failed)} documents failed to convert:")
+        for source, error in failed.items():
+            print(f"[red]{source}[/red]: {error}")
+        raise typer.Exit(1)
 
 
 @app.command()
@@ -108,7 +190,13 @@ def delete(*, yes: bool = False) -> None:
 
 
 @app.command()
-def search(query: str, min_score: float = 0.0, limit: Optional[int] = None) -> None:
+def search(
+    query: str,
+    *,
+    min_score: float = 0.0,
+    limit: Optional[int] = None,
+    deep: bool = False,
+) -> None:
     """
     Search for text in the index.
 
@@ -116,14 +204,18 @@ def search(query: str, min_score: float = 0.0, limit: Optional[int] = None) -> N
         query: Text to search for.
         min_score: Minimum score to consider.
         limit: Maximum number of results to return.
+        deep: Also search queries expanded with the top terms of the results.
     """
     print("\n[bold]Initializing...[/bold]")
 
     from logos.entities.paragraph import ParagraphReference
+    from logos.search.deep import deep_search
     from logos.search.index import search_index
 
+    search_function = deep_search if deep else search_index
+
     print(f"\nResults for query: [yellow]'{query}'\n")
-    for result in search_index(query, min_score=min_score, limit=limit):
+    for result in search_function(query, min_score=min_score, limit=limit):
         print(f"[gray]{'-'*80}")
         print(f"Score: [yellow]{result.score:.4f}")
         metadata, text = result.text.embed_text.split("\n\n", 1)
@@ -131,5 +223,137 @@ def search(query: str, min_score: float = 0.0, limit: Optional[int] = None) -> N
         print(f"{metadata}\n\n[italic]{ParagraphReference.format(text)}[/italic]\n")
 
 
+@app.command(name="eval")
+def evaluate(  # noqa: PLR0913
+    queries: Path,
+    *,
+    k: int = 10,
+    min_score: float = 0.0,
+    version: Optional[str] = None,
+    deep: bool = False,
+    name: Optional[str] = None,
+    runs: Optional[Path] = None,
+) -> None:
+    """
+    Evaluate the search on labeled queries and compare it with previous runs.
+
+    Each line of the queries file is a JSON object with a `query` and a list of
+    `expected` paragraphs, each one with its `source` and `paragraph` reference.
+    Results are matched with them by the source type and title and the
+    paragraph reference. Build indexes with different configurations to
+    evaluate each one of them by its version.
+
+    Args:
+        queries: JSONL file with the labeled queries.
+        k: Number of results per query to evaluate.
+        min_score: Minimum score to consider.
+        version: Index version to evaluate. If None, use the current version.
+        deep: Also search queries expanded with the top terms of the results.
+        name: Name of the run in the comparison table.
+        runs: JSONL file to save runs to. Defaults to `eval.jsonl` in the root.
+    """
+    print("\n[bold]Initializing...[/bold]")
+
+    from rich.table import Table
+
+    from logos.data.index import INDEX_VERSIONS_LOCATION, get_current_version
+    from logos.search.deep import deep_search
+    from logos.search.evaluation import (
+        EVAL_RUNS_LOCATION,
+        evaluate,
+        load_eval_queries,
+        load_eval_runs,
+        save_eval_run,
+    )
+    from logos.search.index import search_index
+
+    version = version or get_current_version()
+    if version is None:
+        print("[red]There is no index to evaluate.[/red]")
+        raise typer.Exit(1)
+    if not (INDEX_VERSIONS_LOCATION / version).is_dir():
+        print(f"[red]Index version {version} does not exist.[/red]")
+        raise typer.Exit(1)
+
+    runs = runs or EVAL_RUNS_LOCATION
+    eval_queries = load_eval_queries(queries)
+    print(f"Evaluating {len(eval_queries)} queries on index version {version}...")
+    run = evaluate(
+        eval_queries,
+        k=k,
+        min_score=min_score,
+        search_function=deep_search if deep else search_index,
+        version=version,
+        name=name,
+    )
+    save_eval_run(run, runs)
+
+    table = Table(title=f"Evaluation runs saved in {runs}")
+    table.add_column("Run")
+    table.add_column("Model")
+    for column in ("k", "Recall@k", "MRR", "nDCG@k", "p50 ms", "p95 ms"):
+        table.add_column(column, justify="right")
+    for column in ("Load MB", "Query MB", "Index MB"):
+        table.add_column(column, justify="right")
+
+    for saved_run in load_eval_runs(runs):
+        p50, p95 = saved_run.latency_percentiles_ms
+        table.add_row(
+            saved_run.name,
+            Path(saved_run.model).name,
+            str(saved_run.k),
+            f"{saved_run.recall:.3f}",
+            f"{saved_run.mrr:.3f}",
+            f"{saved_run.ndcg:.3f}",
+            f"{p50:.1f}",
+            f"{p95:.1f}",
+            f"{saved_run.load_memory_mb:.0f}",
+            f"{saved_run.peak_memory_mb:.2f}",
+            f"{saved_run.index_size_mb:.1f}",
+            style="bold" if saved_run.created_at == run.created_at else None,
+        )
+    print(table)
+
+
+@app.command()
+def serve(  # noqa: PLR0913
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_batch_size: int = 32,
+    max_wait: float = 0.005,
+    max_queue_size: int = 256,
+    timeout: float = 10.0,
+) -> None:
+    """
+    Serve the search HTTP API.
+
+    Concurrent queries are encoded together in batches and identical queries
+    waiting for results share the same execution.
+
+    Args:
+        host: Host to bind the server to.
+        port: Port to bind the server to.
+        max_batch_size: Maximum number of queries to encode in a single batch.
+        max_wait: Maximum time in seconds to wait for a batch to be filled.
+        max_queue_size: Maximum number of queries waiting before rejecting new ones.
+        timeout: Maximum time in seconds to answer a query.
+    """
+    print("\n[bold]Initializing...[/bold]")
+
+    import uvicorn
+
+    from logos.search.api import create_app
+    from logos.search.service import SearchService
+
+    service = SearchService(
+        max_batch_size=max_batch_size,
+        max_wait=max_wait,
+        max_queue_size=max_queue_size,
+        timeout=timeout,
+    )
+    uvicorn.run(create_app(service), host=host, port=port)
+
+
 if __name__ == "__main__":
     app()
@@ -4,9 +4,10 @@ Configurations for the logos app.
 
 import os
 
+from enum import StrEnum
 from pathlib import Path
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PositiveInt
 
 
 class ModelInstructionsConfig(BaseModel):
@@ -18,6 +19,26 @@ class ModelInstructionsConfig(BaseModel):
     data: str = ""
 
 
+class FirstStageMethod(StrEnum):
+    """
+    Compact representation used on the first stage of a two-stage search.
+    """
+
+    binary = "binary"
+    pca = "pca"
+
+
+class FirstStageConfig(BaseModel):
+    """
+    Configuration for two-stage dense search, where candidates are retrieved
+    with compact vectors and rescored with the full dimension vectors.
+    """
+
+    method: FirstStageMethod = FirstStageMethod.binary
+    dimensions: PositiveInt | None = None
+    oversample: PositiveInt = 10
+
+
 class Config:
     """
     Singleton class to store configurations.
@@ -34,3 +55,12 @@ class Config:
         data="data: ",
     )
     """Instructions for the default model to prepend queries and texts."""
+
+    FIRST_STAGE: FirstStageConfig | None = None
+    """Two-stage search configuration for new indexes. If None, search is exact."""
+
+    RELATED_LIMIT = 10
+    """Number of related passages precomputed per chunk. If 0, none is computed."""
+
+    INDEX_KEEP_VERSIONS = 2
+    """Number of most recent index versions to keep on disk, besides the current."""
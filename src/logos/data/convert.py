@@ -0,0 +1,241 @@
+"""
+Conversion of original .doc/.docx documents into cleaned .txt files.
+
+"""
+
+import hashlib
+import json
+import re
+import shutil
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from tqdm import tqdm
+
+from logos.config import Config
+from logos.data.io import write_text_atomic
+
+
+CONVERT_STATE_LOCATION = Config.ROOT_FOLDER / "convert.json"
+"""Path to the file storing the source hashes of already converted documents."""
+
+SOURCE_SUFFIXES = (".doc", ".docx")
+"""Suffixes of the source files accepted for conversion."""
+
+CLEANUP_REGEX_SUBSTITUTIONS: list[tuple[re.Pattern, str]] = [
+    # Remove non-breaking spaces and tabs.
+    (re.compile(r"[\u00A0\t]"), " "),
+    # Remove empty parentheses and brackets.
+    (re.compile(r"[\(\[]\s*[\)\]]"), ""),
+    # Add missing space after punctuation and before parentheses and brackets.
+    (re.compile(r"([\)\],.!?])(?=\w)|([\(\[])(?<=\w[\(\[])"), r"\1 \2"),
+    # Remove hanging space after quotes, parentheses and brackets openers and
+    # before their closers, remove spaces on line starts and ends and replace
+    # multiple spaces with single spaces.
+    (
+        re.compile(
+            r"(?=[ \n])(?:"
+            r" (?<=[\u2018\u201C\(\[] ) *"
+            r"| +(?=[\u2019\u201D\)\]])"
+            r"| +(\n) *"
+            r"|(\n) +"
+            r"|( ) +"
+            r")",
+        ),
+        r"\1\2\3",
+    ),
+    # Remove lines with only punctuation, spaces or numbers.
+    (re.compile(r"\n[ ,.!?0-9]+\n"), "\n"),
+    # Remove first line with only numbers.
+    (re.compile(r"\A\d+\n{2,}"), ""),
+    # Remove last line with only numbers, limit the number of newlines to 2,
+    # remove hanging space before punctuation and remove duplicated punctuation.
+    (
+        re.compile(
+            r"(?=[\n ,.!?°º])(?:"
+            r"\n{2,}\d+$"
+            r"|(\n\n)\n+"
+            r"| ([,.!?°º])(?: ?\2)*"
+            r"|([,.!?°º])(?: ?\3)+"
+            r")",
+        ),
+        r"\1\2\3",
+    ),
+    # Replace custom double quotes with standard double quotes.
+    (re.compile(r"[\u2018\u2019\u201C\u201D]"), '"'),
+    # Replace custom single quotes with standard single quotes.
+    (re.compile(r"[\u201A\u201B]"), "'"),
+]
+"""
+Precompiled cleaning rules, applied in order. Rules are fused into as few passes
+as possible, while keeping the same result of applying each rule in sequence.
+Alternations are prefixed by a lookahead on their first characters to let the
+regex engine skip positions that cannot match.
+"""
+
+_CLEANUP_SIGNATURE = hashlib.sha256(
+    repr([(p.pattern, r) for p, r in CLEANUP_REGEX_SUBSTITUTIONS]).encode(),
+).hexdigest()
+"""Signature of the cleaning rules, to invalidate conversions when they change."""
+
+
+def clean_text(text: str) -> str:
+    """
+    Clean up an extracted text for further processing.
+    """
+    for pattern, replacement in CLEANUP_REGEX_SUBSTITUTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _hash_source(path: Path) -> str:
+    """
+    Hash the source file contents together with the cleaning rules signature.
+    """
+    with path.open("rb") as file:
+        digest = hashlib.file_digest(file, "sha256")
+    digest.update(_CLEANUP_SIGNATURE.encode())
+    return digest.hexdigest()
+
+
+def _load_state() -> dict[str, str]:
+    """
+    Load the source hashes of the already converted documents.
+    """
+    if not CONVERT_STATE_LOCATION.exists():
+        return {}
+    return json.loads(CONVERT_STATE_LOCATION.read_text(encoding="utf-8"))
+
+
+def _convert_doc_files(sources: list[Path], tmp_dir: Path) -> dict[Path, Path]:
+    """
+    Convert .doc files to temporary .docx files with a single call, so Word is
+    started only once, returning the .docx file of each source.
+    """
+    if not sources:
+        return {}
+
+    from doc2docx import convert as convert_doc2docx
+
+    input_dir, output_dir = tmp_dir / "doc", tmp_dir / "docx"
+    input_dir.mkdir()
+    output_dir.mkdir()
+
+    # Sources are copied with unique names, as they may come from many folders
+    docx_files = {}
+    for i, source in enumerate(sources):
+        name = f"{i}-{source.stem}"
+        shutil.copyfile(source, input_dir / f"{name}.doc")
+        docx_files[source] = output_dir / f"{name}.docx"
+
+    convert_doc2docx(str(input_dir), str(output_dir))
+    return docx_files
+
+
+def _extract_file(docx_file: Path, output: Path) -> Path:
+    """
+    Extract, clean and write the text of a single .docx file.
+    """
+    from docx2txt import process as convert_docx2txt
+
+    write_text_atomic(output, clean_text(convert_docx2txt(docx_file)))
+    return output
+
+
+def list_source_files(paths: list[Path]) -> list[Path]:
+    """
+    List all .doc and .docx files in the provided paths, searching directories
+    recursively. When both versions of a document exist, the .doc is preferred.
+    """
+    files = {
+        rp
+        for p in paths
+        for rp in (list(p.rglob("*")) if p.is_dir() else [p])
+        if rp.is_file() and rp.suffix.lower() in SOURCE_SUFFIXES
+    }
+    return sorted(
+        f
+        for f in files
+        if not (f.suffix.lower() == ".docx" and f.with_suffix(".doc") in files)
+    )
+
+
+def convert_documents(
+    paths: list[Path],
+    destination: Path,
+    *,
+    workers: int | None = None,
+    force: bool = False,
+) -> tuple[list[Path], dict[Path, str]]:
+    """
+    Convert .doc and .docx files into cleaned .txt files, placed under a folder
+    with the same name of the parent folder of each source file.
+
+    Files are skipped when their contents did not change since the last
+    conversion. The .doc files are first converted to .docx all at once, and
+    then texts are extracted and cleaned in parallel. The outputs are written
+    atomically. A file that fails to convert does not stop the others, which
+    are recorded as converted.
+
+    Args:
+        paths: List of files or directories to convert.
+        destination: Root path to place the converted .txt files.
+        workers: Number of worker processes. If None, use all available CPUs.
+        force: Whether to convert all files, even if unchanged.
+
+    Returns:
+        List of .txt files written and the error of each source file that
+        failed to convert.
+    """
+    state = _load_state()
+    pending: dict[Path, tuple[str, str]] = {}
+    for source in list_source_files(paths):
+        output = destination / source.parent.name / f"{source.stem}.txt"
+        source_hash = _hash_source(source)
+        key = str(output.resolve())
+        if not force and output.exists() and state.get(key) == source_hash:
+            continue
+        pending[source] = (key, source_hash)
+
+    if not pending:
+        return [], {}
+
+    written: list[Path] = []
+    failed: dict[Path, str] = {}
+    try:
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            ProcessPoolExecutor(max_workers=workers) as executor,
+        ):
+            docx_files = _convert_doc_files(
+                [source for source in pending if source.suffix.lower() == ".doc"],
+                Path(tmp_dir),
+            )
+            futures = {
+                executor.submit(
+                    _extract_file,
+                    docx_files.get(source, source),
+                    Path(key),
+                ): source
+                for source, (key, _) in pending.items()
+            }
+            for future in tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="Converting documents",
+                unit="file",
+            ):
+                source = futures[future]
+                try:
+                    written.append(future.result())
+                except Exception as exc:  # noqa: BLE001
+                    failed[source] = f"{type(exc).__name__}: {exc}"
+                    continue
+                key, source_hash = pending[source]
+                state[key] = source_hash
+    finally:
+        write_text_atomic(CONVERT_STATE_LOCATION, json.dumps(state, indent=2))
+
+    return sorted(written), dict(sorted(failed.items()))
@@ -3,6 +3,7 @@ Document extraction process.
 
 """
 
+from functools import partial
 from pathlib import Path
 from uuid import NAMESPACE_DNS, uuid5
 
@@ -101,11 +102,24 @@ def _post_process_nodes_fix_relationships(nodes: list[TextNode]) -> None:
         next_node.relationships[NodeRelationship.PREVIOUS] = node.as_related_node_info()
 
 
-def parse_documents_into_nodes(documents: list[Document]) -> list[TextNode]:
+def parse_documents_into_nodes(
+    documents: list[Document],
+    *,
+    model_path: str | None = None,
+) -> list[TextNode]:
     """
-    Parse documents into text nodes.
+    Parse documents into text nodes, with chunks sized by the tokens of the
+    embedding model.
+
+    Args:
+        documents: Documents to parse.
+        model_path: Model to count tokens with. If None, use the model of the
+            current index.
+
+    Returns:
+        List of text nodes.
     """
-    from logos.data.index import tokenize_text
+    from logos.data.index import get_embedding_model, tokenize_text
 
     markdown_parser = MarkdownNodeParser.from_defaults()
     section_nodes = markdown_parser.get_nodes_from_documents(documents)
@@ -114,7 +128,7 @@ def parse_documents_into_nodes(documents: list[Document]) -> list[TextNode]:
     sentence_parser = SentenceSplitter.from_defaults(
         chunk_size=192,
         chunk_overlap=32,
-        tokenizer=tokenize_text,
+        tokenizer=partial(tokenize_text, model=get_embedding_model(model_path)),
         paragraph_separator="\n\n",
     )
     nodes = sentence_parser.get_nodes_from_documents(section_nodes)
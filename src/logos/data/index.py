@@ -1,18 +1,37 @@
 """
 Indexing functions for the CLI.
 
+The index is stored in versioned directories, each one with a manifest. A
+pointer file holds the current version and is replaced atomically after a new
+version is fully written, so readers never see a missing or partial index.
+
 """
 
+import logging
 import shutil
+import threading
+import time
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import UTC, datetime
 from functools import lru_cache
 from typing import TYPE_CHECKING
 
+from pydantic import BaseModel
 from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 from txtai.embeddings import Embeddings
 
 from logos.config import Config
+from logos.data.io import write_text_atomic
+from logos.data.pool import parallel_encoding
+from logos.data.related import (
+    enable_related_passages,
+    load_related_passages,
+    save_related_passages,
+    track_related_passages,
+)
 from logos.entities.text import TextChunk
 
 
@@ -24,17 +43,82 @@ if TYPE_CHECKING:
 INDEX_DEFAULT_LOCATION = Config.ROOT_FOLDER / "index"
 """Path to the default location of the index."""
 
+INDEX_VERSIONS_LOCATION = INDEX_DEFAULT_LOCATION / "versions"
+"""Path to the directory holding one subdirectory per index version."""
 
-@lru_cache
-def get_or_create_index() -> Embeddings:
+INDEX_CURRENT_POINTER = INDEX_DEFAULT_LOCATION / "CURRENT"
+"""Path to the file holding the name of the current index version."""
+
+INDEX_MANIFEST_NAME = "manifest.json"
+"""Name of the manifest file stored inside each index version directory."""
+
+INDEX_TMP_PREFIX = ".tmp-"
+"""Prefix of the temporary directories where index versions are written."""
+
+INDEX_TMP_MAX_AGE = 3600
+"""Seconds after which a temporary index directory is left from a failed run."""
+
+_MODELS_CACHE: dict = {}
+"""Models shared across all loaded index versions to avoid reloading them."""
+
+_loaded_index: tuple[str | None, Embeddings] | None = None
+"""Version and index being served."""
+
+_preloading: tuple[str, Future] | None = None
+"""Version and task of the index version being loaded in the background."""
+
+_index_lock = threading.Lock()
+"""Lock to swap the loaded index."""
+
+_loader = ThreadPoolExecutor(1, thread_name_prefix="logos-index-loader")
+"""Background thread to load new index versions."""
+
+logger = logging.getLogger(__name__)
+
+
+class IndexManifest(BaseModel):
     """
-    Get or create the index.
+    Description of an index version.
     """
 
-    if not INDEX_DEFAULT_LOCATION.exists() or (
-        INDEX_DEFAULT_LOCATION.is_dir() and not list(INDEX_DEFAULT_LOCATION.glob("*"))
-    ):
-        return Embeddings(
+    version: str
+    created_at: datetime
+    model: str
+    count: int
+    parent: str | None = None
+
+
+def get_current_version() -> str | None:
+    """
+    Get the current index version, or None if there is no index.
+    """
+    try:
+        return INDEX_CURRENT_POINTER.read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def get_manifest(version: str) -> IndexManifest:
+    """
+    Get the manifest of an index version.
+    """
+    manifest_path = INDEX_VERSIONS_LOCATION / version / INDEX_MANIFEST_NAME
+    return IndexManifest.model_validate_json(manifest_path.read_text(encoding="utf-8"))
+
+
+def open_index(version: str | None) -> Embeddings:
+    """
+    Load an index version from disk, or create a new index if version is None.
+    """
+    if version is None:
+        extra_config = {}
+        if Config.FIRST_STAGE is not None:
+            extra_config.update(
+                backend="logos.search.ann.TwoStageANN",
+                twostage=Config.FIRST_STAGE.model_dump(mode="json"),
+            )
+        embeddings = Embeddings(
+            models=_MODELS_CACHE,
             autoid="uuid5",
             keyword=True,
             hybrid=True,
@@ -47,53 +131,258 @@ def get_or_create_index() -> Embeddings:
                 terms=True,
                 normalize=True,
             ),
+            **extra_config,
         )
+        if Config.RELATED_LIMIT > 0:
+            enable_related_passages(embeddings)
+        return embeddings
 
-    embeddings = Embeddings()
-    embeddings.load(str(INDEX_DEFAULT_LOCATION))
+    embeddings = Embeddings(models=_MODELS_CACHE)
+    embeddings.load(str(INDEX_VERSIONS_LOCATION / version))
+    load_related_passages(embeddings, INDEX_VERSIONS_LOCATION / version)
     return embeddings
 
 
-def get_embedding_model() -> SentenceTransformer:
+def _check_index_layout() -> None:
     """
-    Get the embedding model used in the index.
+    Raise an error if the index was saved with the old unversioned layout,
+    which would otherwise be silently ignored.
     """
-    return get_or_create_index().model.model
+    if INDEX_DEFAULT_LOCATION.is_dir() and any(
+        path.name not in {INDEX_VERSIONS_LOCATION.name, INDEX_CURRENT_POINTER.name}
+        for path in INDEX_DEFAULT_LOCATION.iterdir()
+    ):
+        raise RuntimeError(
+            f"The index at {INDEX_DEFAULT_LOCATION} was saved without versions "
+            "by an old version of logos. Delete it with `logos delete` and "
+            "index the documents again.",
+        )
 
 
-def tokenize_text(text: str) -> list[str]:
+def _preload_index(version: str) -> None:
+    """
+    Load an index version and make it the loaded index once completely loaded.
+    """
+    global _loaded_index  # noqa: PLW0603
+
+    embeddings = open_index(version)
+    with _index_lock:
+        _loaded_index = (version, embeddings)
+
+
+def get_or_create_index() -> Embeddings:
+    """
+    Get or create the index. When a new version becomes current, it is loaded
+    in a background thread while the previous version keeps being served, and
+    it replaces the previous version once loaded, without restarting the
+    application. Only the first load blocks the caller.
+    """
+    global _loaded_index, _preloading  # noqa: PLW0603
+
+    version = get_current_version()
+    if version is None:
+        _check_index_layout()
+
+    with _index_lock:
+        if _loaded_index is None:
+            _loaded_index = (version, open_index(version))
+        elif _loaded_index[0] != version:
+            if _preloading is not None and _preloading[1].done():
+                failed_version, task = _preloading
+                if exc := task.exception():
+                    logger.error("Failed to load index %s: %s", failed_version, exc)
+                _preloading = None
+            if _preloading is None or _preloading[0] != version:
+                _preloading = (version, _loader.submit(_preload_index, version))
+        return _loaded_index[1]
+
+
+@lru_cache(maxsize=1)
+def _create_empty_index(model_path: str) -> Embeddings:  # noqa: ARG001
+    """
+    Create an empty index for a model, used to access the model when the
+    current index was built with another one.
+    """
+    return open_index(None)
+
+
+def clear_index_cache() -> None:
+    """
+    Clear the loaded index and embedding models, forcing them to be reloaded.
+    """
+    global _loaded_index  # noqa: PLW0603
+
+    with _index_lock:
+        _loaded_index = None
+    _create_empty_index.cache_clear()
+    _MODELS_CACHE.clear()
+
+
+def get_index_model_path() -> str:
+    """
+    Get the model of the current index, or the configured model if there is no
+    index yet.
+    """
+    version = get_current_version()
+    return get_manifest(version).model if version is not None else Config.MODEL_PATH
+
+
+def get_embedding_model(model_path: str | None = None) -> SentenceTransformer:
+    """
+    Get an embedding model, reusing the model of the current index when it is
+    the same one.
+
+    Args:
+        model_path: Model to get. If None, use the model of the current index.
+
+    Returns:
+        Sentence-transformers model.
+    """
+    if model_path is None or model_path == get_index_model_path():
+        return get_or_create_index().model.model
+    return _create_empty_index(model_path).model.model
+
+
+def tokenize_text(text: str, model: SentenceTransformer | None = None) -> list[str]:
     """
     Return the list of tokens for a given text according to the chosen model.
+
+    Args:
+        text: Text to tokenize.
+        model: Model whose tokenizer to use. If None, use the current index one.
+
+    Returns:
+        List of tokens.
     """
-    model = get_embedding_model()
+    model = get_embedding_model() if model is None else model
     tokenizer: PreTrainedTokenizerFast = model.tokenizer
     token_ids: Tensor = model.tokenize([text])["input_ids"][0]
     text_tokens: list[str] = tokenizer.convert_ids_to_tokens(token_ids)
     return text_tokens
 
 
-def index_documents(data: list[TextChunk]) -> None:
+def save_index_version(embeddings: Embeddings, parent: str | None = None) -> str:
+    """
+    Save the index as a new version and make it the current one.
+
+    The version is written to a temporary directory that is renamed once
+    complete, and only then the current pointer is atomically replaced.
+
+    Args:
+        embeddings: Index to save.
+        parent: Version the index was derived from, if any.
+
+    Returns:
+        Name of the new version.
     """
-    Index a list of documents.
+    created_at = datetime.now(UTC)
+    version = created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    tmp_path = INDEX_VERSIONS_LOCATION / f"{INDEX_TMP_PREFIX}{version}"
+    try:
+        embeddings.save(str(tmp_path))
+        save_related_passages(embeddings, tmp_path)
+        manifest = IndexManifest(
+            version=version,
+            created_at=created_at,
+            model=embeddings.config["path"],
+            count=embeddings.count(),
+            parent=parent,
+        )
+        write_text_atomic(
+            tmp_path / INDEX_MANIFEST_NAME,
+            manifest.model_dump_json(indent=2),
+        )
+        tmp_path.rename(INDEX_VERSIONS_LOCATION / version)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    write_text_atomic(INDEX_CURRENT_POINTER, version)
+    collect_old_versions()
+    return version
+
+
+def collect_old_versions(keep: int | None = None) -> list[str]:
+    """
+    Delete old index versions, never deleting the current one, and temporary
+    directories left by failed runs.
+
+    Args:
+        keep: Number of most recent versions to keep besides the current one.
+            If None, use `Config.INDEX_KEEP_VERSIONS`.
+
+    Returns:
+        List of deleted versions.
+    """
+    keep = Config.INDEX_KEEP_VERSIONS if keep is None else keep
+    current = get_current_version()
+    versions = sorted(
+        (
+            path.name
+            for path in INDEX_VERSIONS_LOCATION.glob("*")
+            if path.is_dir() and not path.name.startswith(".")
+        ),
+        reverse=True,
+    )
+    deleted = [v for v in versions if v != current][keep:]
+
+    # Recent temporary directories may be being written by another process
+    deleted += [
+        path.name
+        for path in INDEX_VERSIONS_LOCATION.glob(f"{INDEX_TMP_PREFIX}*")
+        if time.time() - path.stat().st_mtime > INDEX_TMP_MAX_AGE
+    ]
+    for version in deleted:
+        shutil.rmtree(INDEX_VERSIONS_LOCATION / version, ignore_errors=True)
+    return deleted
+
+
+def index_documents(
+    data: list[TextChunk],
+    *,
+    reset: bool = False,
+    workers: int = 1,
+) -> str:
+    """
+    Index a list of documents into a new index version.
+
+    The documents are upserted into a copy of the current version, or into a
+    new empty index if `reset` is True, while the current version keeps being
+    served. The new version becomes current once completely saved.
+
+    Args:
+        data: List of text chunks to index.
+        reset: Whether to index into a new empty index instead of the current.
+        workers: Number of processes to compute embeddings. If 1, use a single
+            process with all available threads.
+
+    Returns:
+        Name of the new version.
     """
 
     # Replace the text with the representation prepared for embedding
     for doc in data:
         doc.text = doc.embed_text
 
-    embeddings = get_or_create_index()
-    embeddings.upsert(
-        tqdm(
-            iterable=[(doc.id, doc.model_dump(exclude="id")) for doc in data],
-            desc="Indexing text chunks",
-            unit="chunk",
-        ),
+    parent = None if reset else get_current_version()
+    embeddings = open_index(parent)
+    documents = tqdm(
+        iterable=[(doc.id, doc.model_dump(exclude="id")) for doc in data],
+        desc="Indexing text chunks",
+        unit="chunk",
     )
-    embeddings.save(str(INDEX_DEFAULT_LOCATION))
+    with (
+        parallel_encoding(embeddings, workers) if workers > 1 else nullcontext(),
+        track_related_passages(embeddings, Config.RELATED_LIMIT),
+    ):
+        embeddings.upsert(documents)
+    return save_index_version(embeddings, parent=parent)
 
 
 def delete_index() -> None:
     """
     Delete the index.
     """
+    INDEX_CURRENT_POINTER.unlink(missing_ok=True)
+    clear_index_cache()
     shutil.rmtree(INDEX_DEFAULT_LOCATION, ignore_errors=True)
@@ -0,0 +1,40 @@
+"""
+File system helpers shared by the data functions.
+
+"""
+
+import os
+import tempfile
+
+from pathlib import Path
+
+
+def _get_umask() -> int:
+    """
+    Get the file mode creation mask of the process, which is only read by
+    setting a new one.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _get_umask()
+"""File mode creation mask of the process, to set the mode of written files."""
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    """
+    Write a text file atomically, so readers never see a partially written file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(text)
+        # Temporary files are only readable by their owner, unlike new files
+        Path(tmp_path).chmod(0o666 & ~_UMASK)
+        Path(tmp_path).replace(path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,217 @@
+"""
+Multi-process pool to compute embeddings on CPU.
+
+"""
+
+import multiprocessing as mp
+import os
+
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+
+if TYPE_CHECKING:
+    from multiprocessing.sharedctypes import Synchronized
+
+    from sentence_transformers import SentenceTransformer
+    from txtai.embeddings import Embeddings
+
+
+CHUNKS_PER_WORKER = 4
+"""Number of chunks each worker receives per encoded batch, to balance load."""
+
+_WORKER_MODEL: "SentenceTransformer | None" = None
+"""Model loaded by each worker process."""
+
+
+@contextmanager
+def _worker_environment(threads: int) -> Iterator[None]:
+    """
+    Set the environment inherited by the worker processes spawned meanwhile,
+    so their BLAS and OpenMP thread pools are limited from their first import.
+    """
+    environment = {
+        "OMP_NUM_THREADS": str(threads),
+        "MKL_NUM_THREADS": str(threads),
+        "OPENBLAS_NUM_THREADS": str(threads),
+        "TOKENIZERS_PARALLELISM": "false",
+    }
+    previous = {var: os.environ.get(var) for var in environment}
+    os.environ.update(environment)
+    try:
+        yield
+    finally:
+        for var, value in previous.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _init_worker(
+    model_path: str,
+    counter: "Synchronized[int]",
+    *,
+    threads: int,
+    pin: bool,
+) -> None:
+    """
+    Limit the number of threads of the worker, optionally pin it to its own set
+    of cores, and load its copy of the model.
+    """
+    global _WORKER_MODEL  # noqa: PLW0603
+
+    with counter.get_lock():
+        worker_id = counter.value
+        counter.value += 1
+
+    if pin and hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        start = (worker_id * threads) % len(cores)
+        os.sched_setaffinity(0, cores[start : start + threads] or cores)
+
+    import torch
+
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _WORKER_MODEL = SentenceTransformer(model_path, device="cpu")
+
+
+def _encode_chunk(texts: list[str], batch_size: int) -> np.ndarray:
+    """
+    Encode a chunk of texts with the model of the worker.
+    """
+    return _WORKER_MODEL.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+
+class EmbeddingPool:
+    """
+    Pool of worker processes, each with its own copy of a sentence-transformers
+    model and a fixed number of threads, to encode texts in parallel on CPU.
+
+    Texts are split into chunks with a similar number of tokens, so all workers
+    receive the same amount of work, and results are gathered in input order.
+
+    Workers are spawned on demand, so the thread limits are set on the
+    environment of the main process while the pool is open.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        model: "SentenceTransformer",
+        model_path: str,
+        workers: int,
+        *,
+        threads: int | None = None,
+        pin: bool = True,
+    ) -> None:
+        """
+        Args:
+            model: Model loaded in the main process, used to count tokens.
+            model_path: Path of the model to be loaded by each worker.
+            workers: Number of worker processes.
+            threads: Number of threads per worker. If None, split all CPUs.
+            pin: Whether to pin each worker to its own set of cores (Linux only).
+        """
+        self.model = model
+        self.workers = workers
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        context = mp.get_context("spawn")
+        self._environment = _worker_environment(self.threads)
+        self._environment.__enter__()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=partial(_init_worker, threads=self.threads, pin=pin),
+            initargs=(model_path, context.Value("i", 0)),
+        )
+
+    def __enter__(self) -> "EmbeddingPool":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Shutdown the worker processes and restore the environment.
+        """
+        try:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        finally:
+            self._environment.__exit__(None, None, None)
+
+    def _token_counts(self, texts: list[str]) -> np.ndarray:
+        """
+        Count the tokens of each text, truncated to the model maximum length.
+        """
+        token_ids = self.model.tokenizer(texts, add_special_tokens=True)["input_ids"]
+        counts = np.fromiter(map(len, token_ids), dtype=np.int64, count=len(texts))
+        return np.minimum(counts, self.model.max_seq_length)
+
+    def _split(self, texts: list[str]) -> list[np.ndarray]:
+        """
+        Split texts into chunks of indices with a similar number of tokens.
+        Texts are sorted by length, so each chunk has texts of similar length,
+        which reduces padding, and the longest chunks are dispatched first.
+        """
+        counts = self._token_counts(texts)
+        order = np.argsort(-counts, kind="stable")
+        n_chunks = min(len(texts), self.workers * CHUNKS_PER_WORKER)
+        boundaries = np.linspace(0, counts.sum(), n_chunks + 1)[1:-1]
+        splits = np.searchsorted(np.cumsum(counts[order]), boundaries, side="right")
+        return [chunk for chunk in np.split(order, splits) if len(chunk)]
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode texts in parallel, returning embeddings in the same order.
+        """
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()))
+
+        chunks = self._split(texts)
+        futures = [
+            self._executor.submit(_encode_chunk, [texts[i] for i in chunk], batch_size)
+            for chunk in chunks
+        ]
+        embeddings = None
+        for chunk, future in zip(chunks, futures):
+            result = future.result()
+            if embeddings is None:
+                embeddings = np.empty((len(texts), result.shape[1]), result.dtype)
+            embeddings[chunk] = result
+        return embeddings
+
+
+@contextmanager
+def parallel_encoding(
+    embeddings: "Embeddings",
+    workers: int,
+    threads: int | None = None,
+) -> Iterator[EmbeddingPool]:
+    """
+    Encode the data indexed by a txtai index with a pool of worker processes.
+
+    Args:
+        embeddings: Index whose vectors model must be parallelized.
+        workers: Number of worker processes.
+        threads: Number of threads per worker. If None, split all CPUs.
+    """
+    vectors = embeddings.model
+    with EmbeddingPool(
+        model=vectors.model,
+        model_path=embeddings.config["path"],
+        workers=workers,
+        threads=threads,
+    ) as pool:
+        vectors.encode = lambda data: pool.encode(data, vectors.encodebatch)
+        try:
+            yield pool
+        finally:
+            del vectors.encode
@@ -0,0 +1,156 @@
+"""
+Related passages of each text chunk, precomputed from the index vectors.
+
+"""
+
+import json
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from logos.data.io import write_text_atomic
+
+
+if TYPE_CHECKING:
+    from txtai.embeddings import Embeddings
+
+
+RELATED_FILE_NAME = "related.json"
+"""Name of the file stored inside each index version with the related passages."""
+
+RelatedPassages = dict[str, list[tuple[str, float]]]
+"""Most similar chunks of each chunk, as (id, score) pairs sorted by score."""
+
+_RELATED: "WeakKeyDictionary[Embeddings, RelatedPassages]" = WeakKeyDictionary()
+"""Related passages of each loaded index, released together with the index."""
+
+
+def get_related_passages(embeddings: "Embeddings") -> RelatedPassages | None:
+    """
+    Get the related passages of an index, or None if it has no related passages.
+    """
+    return _RELATED.get(embeddings)
+
+
+def enable_related_passages(embeddings: "Embeddings") -> None:
+    """
+    Compute the related passages of the chunks added to a new index.
+    """
+    _RELATED[embeddings] = {}
+
+
+def load_related_passages(embeddings: "Embeddings", path: Path) -> None:
+    """
+    Load the related passages saved with an index, if any.
+    """
+    related_path = path / RELATED_FILE_NAME
+    if related_path.exists():
+        related = json.loads(related_path.read_text(encoding="utf-8"))
+        _RELATED[embeddings] = {
+            uid: list(map(tuple, neighbors)) for uid, neighbors in related.items()
+        }
+
+
+def save_related_passages(embeddings: "Embeddings", path: Path) -> None:
+    """
+    Save the related passages of an index, if any, in its directory.
+    """
+    related = get_related_passages(embeddings)
+    if related is not None:
+        write_text_atomic(path / RELATED_FILE_NAME, json.dumps(related))
+
+
+def _search_neighbors(
+    embeddings: "Embeddings",
+    ids: list[str],
+    vectors: np.ndarray,
+    limit: int,
+) -> RelatedPassages:
+    """
+    Search the nearest chunks of each vector on the index, excluding itself.
+    """
+    indexed_ids = {
+        row["indexid"]: row["id"]
+        for row in embeddings.search(
+            "select id, indexid from txtai",
+            limit=embeddings.count(),
+        )
+    }
+    neighbors: RelatedPassages = {}
+    for uid, results in zip(ids, embeddings.ann.search(vectors, limit + 1)):
+        neighbors[uid] = [
+            (indexed_ids[indexid], score)
+            for indexid, score in results
+            if score > 0 and indexed_ids.get(indexid, uid) != uid
+        ][:limit]
+    return neighbors
+
+
+def _merge_neighbors(
+    related: RelatedPassages,
+    new: RelatedPassages,
+    limit: int,
+) -> None:
+    """
+    Add the neighbors of new chunks, and add the new chunks to the neighbors of
+    the chunks they are close to, keeping only the top neighbors.
+    """
+    related.update(new)
+    for uid, neighbors in new.items():
+        for neighbor, score in neighbors:
+            current = [n for n in related.get(neighbor, []) if n[0] != uid]
+            if len(current) < limit or score > current[-1][1]:
+                current.append((uid, score))
+                current.sort(key=lambda n: n[1], reverse=True)
+            related[neighbor] = current[:limit]
+
+
+@contextmanager
+def track_related_passages(embeddings: "Embeddings", limit: int) -> Iterator[None]:
+    """
+    Update the related passages with the chunks indexed within the context.
+
+    The vectors computed for the new chunks are captured when encoded, and
+    their neighbors are searched on the index with them once indexed, so no
+    chunk is encoded again. The chunks already indexed only get new chunks
+    added to their neighbors when they are among the neighbors of the new
+    chunks, so their neighbors are approximate.
+
+    Args:
+        embeddings: Index where chunks are indexed.
+        limit: Number of related passages to keep per chunk.
+    """
+    related = get_related_passages(embeddings)
+    if related is None or limit <= 0:
+        yield
+        return
+
+    vectors_model = embeddings.model
+    indexed: list[tuple[list[str], np.ndarray]] = []
+
+    def index(documents: Iterator, batchsize: int) -> tuple:
+        ids, dimensions, batches, stream = type(vectors_model).index(
+            vectors_model,
+            documents,
+            batchsize,
+        )
+        with Path(stream).open("rb") as queue:
+            vectors = [np.load(queue) for _ in range(batches)]
+        if ids:
+            indexed.append((ids, np.concatenate(vectors)))
+        return ids, dimensions, batches, stream
+
+    vectors_model.index = index
+    try:
+        yield
+    finally:
+        del vectors_model.index
+
+    for ids, vectors in indexed:
+        new = _search_neighbors(embeddings, ids, vectors, limit)
+        _merge_neighbors(related, new, limit)
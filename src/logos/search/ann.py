@@ -0,0 +1,173 @@
+"""
+Two-stage approximate nearest neighbor index for txtai.
+
+"""
+
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from txtai.ann import ANN
+
+from logos.config import FirstStageConfig, FirstStageMethod
+
+
+class TwoStageANN(ANN):
+    """
+    ANN index that searches candidates with compact vectors and rescores them
+    with the full dimension vectors.
+
+    The compact vectors are either the sign bits of the vectors, searched by
+    Hamming distance, or their projection on the top principal components of
+    the indexed vectors, searched by inner product. The principal components
+    are fitted when the index is built and kept for the vectors appended later
+    and for the queries. Only the compact vectors are kept in memory, while the
+    full vectors are memory-mapped from disk and read only for the candidates.
+
+    Use it setting `backend` to this class path and `twostage` to a dump of a
+    `FirstStageConfig` in the txtai index configuration.
+    """
+
+    def __init__(self, config: dict) -> None:
+        """
+        Args:
+            config: txtai index configuration, with the `twostage` settings.
+        """
+        super().__init__(config)
+        self.first_stage = FirstStageConfig(**config.get("twostage", {}))
+        self.vectors: np.ndarray | None = None
+        self.compact: np.ndarray | None = None
+        self.components: np.ndarray | None = None
+
+    def load(self, path: str) -> None:
+        """
+        Load the full vectors memory-mapped and the compact vectors in memory.
+        """
+        self.vectors = np.load(path, mmap_mode="r", allow_pickle=False)
+        self.compact = np.load(f"{path}.compact", allow_pickle=False)
+        if self.first_stage.method == FirstStageMethod.pca:
+            self.components = np.load(f"{path}.components", allow_pickle=False)
+        self.backend = self._create_backend(self.compact)
+
+    def index(self, embeddings: np.ndarray) -> None:
+        """
+        Build the index from the full dimension vectors.
+        """
+        self.vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.first_stage.method == FirstStageMethod.pca:
+            self.components = self._fit_components(self.vectors)
+        self.compact = self._compress(self.vectors)
+        self.backend = self._create_backend(self.compact)
+
+        self.config["offset"] = embeddings.shape[0]
+        self.metadata({"faiss": faiss.__version__, **self.first_stage.model_dump()})
+
+    def append(self, embeddings: np.ndarray) -> None:
+        """
+        Add new vectors to the index.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        compact = self._compress(embeddings)
+        self.vectors = np.concatenate((self.vectors, embeddings), axis=0)
+        self.compact = np.concatenate((self.compact, compact), axis=0)
+        self.backend.add(compact)
+
+        self.config["offset"] += embeddings.shape[0]
+        self.metadata()
+
+    def delete(self, ids: list[int]) -> None:
+        """
+        Delete vectors from the index by their index ids.
+        """
+        ids = [x for x in ids if x < self.vectors.shape[0]]
+
+        # Deleted rows are zeroed, so they are rescored to 0 and discarded
+        self.vectors = np.array(self.vectors)
+        self.vectors[ids] = 0
+        self.compact[ids] = 0
+        self.backend = self._create_backend(self.compact)
+
+    def search(self, queries: np.ndarray, limit: int) -> list[list[tuple[int, float]]]:
+        """
+        Search candidates with the compact vectors and rescore them with the
+        full vectors, returning the top (index id, score) pairs per query.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        candidates = min(limit * self.first_stage.oversample, self.vectors.shape[0])
+        _, ids = self.backend.search(self._compress(queries), candidates)
+
+        results = []
+        for query, query_ids in zip(queries, ids):
+            candidate_ids = np.sort(query_ids[query_ids >= 0])
+            scores = self.vectors[candidate_ids] @ query
+            top = np.argsort(-scores)[:limit]
+            results.append(list(zip(candidate_ids[top].tolist(), scores[top].tolist())))
+        return results
+
+    def count(self) -> int:
+        """
+        Count the vectors not deleted.
+        """
+        return int(np.count_nonzero(np.any(self.compact != 0, axis=1)))
+
+    def save(self, path: str) -> None:
+        """
+        Save the full and compact vectors.
+        """
+        # Save arrays with streams to prevent the ".npy" suffix being added
+        with Path(path).open("wb") as handle:
+            np.save(handle, np.asarray(self.vectors), allow_pickle=False)
+        with Path(f"{path}.compact").open("wb") as handle:
+            np.save(handle, self.compact, allow_pickle=False)
+        if self.components is not None:
+            with Path(f"{path}.components").open("wb") as handle:
+                np.save(handle, self.components, allow_pickle=False)
+
+    def close(self) -> None:
+        """
+        Release the vectors.
+        """
+        super().close()
+        self.vectors, self.compact, self.components = None, None, None
+
+    @property
+    def dimensions(self) -> int:
+        """
+        Number of dimensions of the vectors kept in the compact vectors, either
+        the leading ones for `binary` or the top principal components for `pca`.
+        """
+        dimensions = self.config["dimensions"]
+        if self.first_stage.method == FirstStageMethod.pca:
+            return min(self.first_stage.dimensions or dimensions // 4, dimensions)
+        return min(self.first_stage.dimensions or dimensions, dimensions)
+
+    def _fit_components(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Fit the top principal components of the vectors, without centering
+        them, so inner products of the projections approximate the inner
+        products of the full vectors.
+        """
+        covariance = (embeddings.T @ embeddings).astype(np.float64)
+        _, eigenvectors = np.linalg.eigh(covariance)
+        top = eigenvectors[:, ::-1][:, : self.dimensions]
+        return np.ascontiguousarray(top.T, dtype=np.float32)
+
+    def _compress(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Build the compact vectors from full dimension vectors.
+        """
+        if self.first_stage.method == FirstStageMethod.pca:
+            return np.ascontiguousarray(embeddings @ self.components.T)
+        return np.packbits(embeddings[:, : self.dimensions] > 0, axis=1)
+
+    def _create_backend(self, compact: np.ndarray) -> faiss.Index | faiss.IndexBinary:
+        """
+        Create the exhaustive search index over the compact vectors.
+        """
+        if self.first_stage.method == FirstStageMethod.binary:
+            backend = faiss.IndexBinaryFlat(compact.shape[1] * 8)
+        else:
+            backend = faiss.IndexFlatIP(compact.shape[1])
+        backend.add(compact)
+        return backend
@@ -0,0 +1,77 @@
+"""
+HTTP API exposing the search service.
+
+"""
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query, status
+
+from logos.entities.query import QueryResult
+from logos.search.service import (
+    MAX_SEARCH_LIMIT,
+    SearchService,
+    ServiceMetrics,
+    ServiceOverloadedError,
+)
+
+
+def create_app(service: SearchService | None = None) -> FastAPI:
+    """
+    Create the HTTP API app around a search service. The index is loaded when
+    the app starts.
+
+    Args:
+        service: Search service to use. If None, use one with default settings.
+
+    Returns:
+        FastAPI app.
+    """
+    service = service or SearchService()
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        await service.start()
+        yield
+        await service.stop()
+
+    app = FastAPI(title="Logos", lifespan=lifespan)
+
+    @app.get("/search")
+    async def search(
+        query: str,
+        min_score: float = 0.0,
+        limit: int | None = Query(None, ge=1, le=MAX_SEARCH_LIMIT),
+    ) -> list[QueryResult]:
+        """
+        Search the index with a query.
+        """
+        try:
+            return await service.search(query, min_score=min_score, limit=limit)
+        except ServiceOverloadedError as exc:
+            raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, str(exc)) from exc
+        except TimeoutError as exc:
+            raise HTTPException(
+                status.HTTP_504_GATEWAY_TIMEOUT,
+                "Search query timed out.",
+            ) from exc
+
+    @app.get("/related/{chunk_id}")
+    async def related(chunk_id: str, limit: int | None = None) -> list[QueryResult]:
+        """
+        Get the passages most similar to a chunk, precomputed when indexing.
+        """
+        try:
+            return await service.related(chunk_id, limit=limit)
+        except ValueError as exc:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, str(exc)) from exc
+
+    @app.get("/metrics")
+    async def metrics() -> ServiceMetrics:
+        """
+        Get the search service latency and queue metrics.
+        """
+        return service.metrics()
+
+    return app
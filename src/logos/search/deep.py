@@ -0,0 +1,198 @@
+"""
+Deep search pipeline that expands a query with the top terms of its results.
+
+"""
+
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from logos.data.index import get_or_create_index
+from logos.entities.paragraph import ParagraphReference
+from logos.entities.query import QueryResult
+from logos.search.index import (
+    DEFAULT_SEARCH_LIMIT,
+    _convert_result,
+    batch_search_index,
+)
+
+
+if TYPE_CHECKING:
+    from txtai.embeddings import Embeddings
+
+
+RRF_K = 60
+"""Rank offset of the reciprocal-rank fusion, which smooths the top ranks."""
+
+
+def search_feedback(
+    query: str,
+    limit: int,
+    *,
+    embeddings: "Embeddings",
+) -> list[QueryResult]:
+    """
+    Search the index with a query only by keywords, using the BM25 term index,
+    so the query does not need to be encoded by the embedding model.
+
+    Args:
+        query: Keyword query to search for.
+        limit: Maximum number of results to return.
+        embeddings: Index to search.
+
+    Returns:
+        List of text chunks, scored by their BM25 score.
+    """
+    scores = dict(embeddings.scoring.search(query, limit))
+    if not scores:
+        return []
+
+    parameters = {f"indexid{i}": indexid for i, indexid in enumerate(scores)}
+    items: list[dict] = embeddings.search(
+        query=f"""
+            select id, indexid, data
+            from txtai
+            where indexid in ({", ".join(f":{name}" for name in parameters)})
+        """,  # noqa: S608
+        limit=len(scores),
+        parameters=parameters,
+    )
+    for item in items:
+        item["score"] = scores[item.pop("indexid")]
+    results = [_convert_result(item, QueryResult) for item in items]
+    return sorted(results, key=lambda result: result.score, reverse=True)
+
+
+def extract_expansion_terms(
+    query: str,
+    results: list[QueryResult],
+    n_terms: int,
+    *,
+    embeddings: "Embeddings",
+) -> list[str]:
+    """
+    Extract the top terms of the results that are not in the query, ranked by
+    their BM25 weights on the sparse index of the results they appear in.
+
+    Args:
+        query: Query the results were found for.
+        results: Results to extract the terms from.
+        n_terms: Maximum number of terms to extract.
+        embeddings: Index whose term statistics are used.
+
+    Returns:
+        List of terms, from the most to the least relevant.
+    """
+    scoring = embeddings.scoring
+    query_terms = set(scoring.tokenize(query))
+
+    term_weights: dict[str, float] = defaultdict(float)
+    for result in results:
+        tokens = scoring.tokenize(ParagraphReference.remove(result.text.text))
+        if not tokens:
+            continue
+        weights = dict(zip(tokens, scoring.weights(tokens)))
+        for term, weight in weights.items():
+            # Terms unknown to the index have no statistics to rely on
+            if term not in query_terms and term in scoring.idf:
+                term_weights[term] += weight * result.score
+
+    ranked = sorted(term_weights.items(), key=lambda item: item[1], reverse=True)
+    return [term for term, _ in ranked[:n_terms]]
+
+
+def expand_query(query: str, terms: list[str], n_queries: int) -> list[str]:
+    """
+    Create new queries adding the terms to the query. Terms are distributed in
+    turns, so each query starts with a different one of the top terms.
+
+    Args:
+        query: Query to expand.
+        terms: Terms to add, from the most to the least relevant.
+        n_queries: Maximum number of queries to create.
+
+    Returns:
+        List of expanded queries.
+    """
+    n_queries = min(n_queries, len(terms))
+    return [f"{query} {' '.join(terms[i::n_queries])}" for i in range(n_queries)]
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[QueryResult]],
+    limit: int | None = None,
+) -> list[QueryResult]:
+    """
+    Fuse rankings of results adding the reciprocal of their rank on each one.
+
+    Args:
+        rankings: Lists of results sorted by relevance.
+        limit: Maximum number of results to return.
+
+    Returns:
+        List of results scored by their fused score.
+    """
+    scores: dict[str, float] = defaultdict(float)
+    results: dict[str, QueryResult] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            scores[result.text.id] += 1 / (RRF_K + rank)
+            results.setdefault(result.text.id, result)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [
+        QueryResult(text=results[uid].text, score=score)
+        for uid, score in ranked[:limit]
+    ]
+
+
+def deep_search(  # noqa: PLR0913
+    similarity_query: str,
+    min_score: float = 0.0,
+    limit: int | None = None,
+    *,
+    n_queries: int = 4,
+    terms_per_query: int = 2,
+    feedback: int = 5,
+    embeddings: "Embeddings | None" = None,
+) -> list[QueryResult]:
+    """
+    Search the index with a query and with new queries expanded with the top
+    terms of its results, fusing all results by reciprocal rank.
+
+    The terms are extracted from the top keyword results of the query, which
+    do not need the query to be encoded. Then, the query and all expanded
+    queries are searched in a single batch, so they are encoded together by
+    the embedding model and their hybrid searches run on the same pass.
+
+    Args:
+        similarity_query: Similarity query to search for.
+        min_score: Minimum score to consider.
+        limit: Maximum number of results to return.
+        n_queries: Number of expanded queries to create.
+        terms_per_query: Number of terms added to each expanded query.
+        feedback: Number of top keyword results to extract terms from.
+        embeddings: Index to search. If None, use the current index.
+
+    Returns:
+        List of text chunks, scored by their fused score.
+    """
+    embeddings = get_or_create_index() if embeddings is None else embeddings
+    if embeddings.scoring is None:
+        raise ValueError("The index has no term statistics. Reset the index.")
+
+    terms = extract_expansion_terms(
+        similarity_query,
+        search_feedback(similarity_query, feedback, embeddings=embeddings),
+        n_queries * terms_per_query,
+        embeddings=embeddings,
+    )
+    queries = [similarity_query, *expand_query(similarity_query, terms, n_queries)]
+    rankings = batch_search_index(
+        queries,
+        min_score=min_score,
+        limit=limit,
+        embeddings=embeddings,
+    )
+    if len(rankings) == 1:
+        return rankings[0]
+    return reciprocal_rank_fusion(rankings, limit=limit or DEFAULT_SEARCH_LIMIT)
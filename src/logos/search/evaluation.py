@@ -0,0 +1,345 @@
+"""
+Offline evaluation of the search quality and latency on labeled queries.
+
+"""
+
+import math
+import sys
+import time
+import tracemalloc
+
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import partial
+from pathlib import Path
+from statistics import mean, quantiles
+
+from pydantic import BaseModel
+
+from logos.config import Config
+from logos.entities.paragraph import ParagraphReference
+from logos.entities.query import QueryResult
+from logos.entities.source import Source
+from logos.entities.text import TextChunk
+
+
+EVAL_RUNS_LOCATION = Config.ROOT_FOLDER / "eval.jsonl"
+"""Default file where evaluation runs are appended."""
+
+SearchFunction = Callable[..., list[QueryResult]]
+"""Search function with the signature of `search_index`."""
+
+
+class ExpectedParagraph(BaseModel):
+    """
+    Paragraph expected to be found for a query.
+    """
+
+    source: Source
+    paragraph: ParagraphReference
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        """
+        Key to match the paragraph with the paragraphs of the text chunks. The
+        source path is ignored, as it depends on where documents were indexed
+        from, and the reference is compared in its normalized format.
+        """
+        return (self.source.type, self.source.title, str(self.paragraph))
+
+
+class EvalQuery(BaseModel):
+    """
+    Query with the paragraphs expected to be found for it.
+    """
+
+    query: str
+    expected: list[ExpectedParagraph]
+
+
+class QueryEvaluation(BaseModel):
+    """
+    Quality and performance metrics of a single query.
+    """
+
+    query: str
+    recall: float
+    reciprocal_rank: float
+    ndcg: float
+    latency_ms: float
+    peak_memory_mb: float
+
+
+class EvalRun(BaseModel):
+    """
+    Evaluation of a set of queries on an index configuration.
+    """
+
+    name: str
+    created_at: datetime
+    version: str
+    model: str
+    config: dict
+    k: int
+    index_size_mb: float
+    load_memory_mb: float = 0.0
+    queries: list[QueryEvaluation]
+
+    @property
+    def recall(self) -> float:
+        """
+        Mean recall at k.
+        """
+        return mean(q.recall for q in self.queries) if self.queries else 0.0
+
+    @property
+    def mrr(self) -> float:
+        """
+        Mean reciprocal rank of the first relevant result.
+        """
+        return mean(q.reciprocal_rank for q in self.queries) if self.queries else 0.0
+
+    @property
+    def ndcg(self) -> float:
+        """
+        Mean normalized discounted cumulative gain at k.
+        """
+        return mean(q.ndcg for q in self.queries) if self.queries else 0.0
+
+    @property
+    def latency_percentiles_ms(self) -> tuple[float, float]:
+        """
+        Median and 95th percentile of the query latencies.
+        """
+        latencies = [q.latency_ms for q in self.queries]
+        if len(latencies) < 2:  # noqa: PLR2004
+            return (latencies[0], latencies[0]) if latencies else (0.0, 0.0)
+        percentiles = quantiles(latencies, n=100, method="inclusive")
+        return percentiles[49], percentiles[94]
+
+    @property
+    def peak_memory_mb(self) -> float:
+        """
+        Largest memory allocated while searching a single query.
+        """
+        return max((q.peak_memory_mb for q in self.queries), default=0.0)
+
+
+def load_eval_queries(path: Path) -> list[EvalQuery]:
+    """
+    Load the labeled queries from a JSONL file, one query per line.
+    """
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [EvalQuery.model_validate_json(line) for line in lines if line.strip()]
+
+
+def load_eval_runs(path: Path = EVAL_RUNS_LOCATION) -> list[EvalRun]:
+    """
+    Load the evaluation runs saved in a JSONL file, if any.
+    """
+    if not path.exists():
+        return []
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [EvalRun.model_validate_json(line) for line in lines if line.strip()]
+
+
+def save_eval_run(run: EvalRun, path: Path = EVAL_RUNS_LOCATION) -> None:
+    """
+    Append an evaluation run to a JSONL file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as file:
+        file.write(run.model_dump_json() + "\n")
+
+
+def _get_peak_resident_memory_mb() -> float:
+    """
+    Get the peak resident memory of the process.
+    """
+    if sys.platform == "win32":
+        import ctypes
+
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [  # noqa: RUF012
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters),
+            counters.cb,
+        )
+        return counters.PeakWorkingSetSize / 1e6
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports the peak in kilobytes and macOS in bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _get_allocated_memory_mb(search: Callable[[], object]) -> float:
+    """
+    Get the peak memory allocated by Python and numpy while running a search.
+    Memory allocated by PyTorch itself is not traced.
+    """
+    tracemalloc.start()
+    try:
+        search()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def _get_chunk_keys(chunk: TextChunk) -> set[tuple[str, str, str]]:
+    """
+    Get the keys of the paragraphs of a text chunk.
+    """
+    source = chunk.source
+    return {(source.type, source.title, str(p)) for p in chunk.paragraphs}
+
+
+def _discounted_cumulative_gain(gains: list[int]) -> float:
+    """
+    Sum the gains of ranked results discounted by the log of their rank.
+    """
+    return sum(gain / math.log2(rank + 1) for rank, gain in enumerate(gains, start=1))
+
+
+def score_ranking(
+    results: list[QueryResult],
+    expected: list[ExpectedParagraph],
+    k: int,
+) -> tuple[float, float, float]:
+    """
+    Score the top k results of a query against the expected paragraphs.
+
+    The gain of a result is the number of expected paragraphs it contains not
+    found by any previous result, so a paragraph split in many chunks counts
+    only once and a chunk with many paragraphs counts for all of them. The
+    ideal ranking sorts the gains of the results and finds each paragraph not
+    found by a separate result, so a perfect ranking scores 1.0 however the
+    paragraphs were grouped in chunks.
+
+    Args:
+        results: Results sorted by relevance.
+        expected: Paragraphs expected to be found.
+        k: Number of top results to score.
+
+    Returns:
+        Recall at k, reciprocal rank of the first relevant result and
+        normalized discounted cumulative gain at k.
+    """
+    expected_keys = {paragraph.key for paragraph in expected}
+    if not expected_keys or k < 1:
+        return 0.0, 0.0, 0.0
+
+    found: set[tuple[str, str, str]] = set()
+    gains: list[int] = []
+    reciprocal_rank = 0.0
+    for rank, result in enumerate(results[:k], start=1):
+        new_keys = (_get_chunk_keys(result.text) & expected_keys) - found
+        found |= new_keys
+        gains.append(len(new_keys))
+        if new_keys and not reciprocal_rank:
+            reciprocal_rank = 1 / rank
+
+    missing_gains = [1] * (len(expected_keys) - len(found))
+    ideal_gains = sorted(gains + missing_gains, reverse=True)[:k]
+    dcg = _discounted_cumulative_gain(gains)
+    ideal_dcg = _discounted_cumulative_gain(ideal_gains)
+    return len(found) / len(expected_keys), reciprocal_rank, dcg / ideal_dcg
+
+
+def evaluate(  # noqa: PLR0913
+    queries: list[EvalQuery],
+    k: int = 10,
+    min_score: float = 0.0,
+    *,
+    search_function: SearchFunction,
+    version: str,
+    name: str | None = None,
+) -> EvalRun:
+    """
+    Load an index version and search labeled queries one by one, measuring the
+    quality of the results, the latency and the memory of each query.
+
+    The memory to load the index and the model is measured apart, by the peak
+    resident memory of the process, which would hide the memory of queries.
+    Each query is searched again with memory tracing, so tracing does not slow
+    down the timed search.
+
+    Args:
+        queries: Labeled queries to search.
+        k: Number of results per query.
+        min_score: Minimum score to consider.
+        search_function: Function to search the queries with.
+        version: Version of the index to search.
+        name: Name of the run. If None, use the version and search function.
+
+    Returns:
+        Evaluation run with the metrics of each query.
+    """
+    from logos.data.index import INDEX_VERSIONS_LOCATION, get_manifest, open_index
+
+    memory_before_load = _get_peak_resident_memory_mb()
+    embeddings = open_index(version)
+    # Warm up the model and caches, so the first query is not penalized
+    if queries:
+        search_function(queries[0].query, limit=k, embeddings=embeddings)
+    load_memory = _get_peak_resident_memory_mb() - memory_before_load
+
+    evaluations = []
+    for eval_query in queries:
+        search = partial(
+            search_function,
+            eval_query.query,
+            min_score=min_score,
+            limit=k,
+            embeddings=embeddings,
+        )
+        start = time.perf_counter()
+        results = search()
+        latency = time.perf_counter() - start
+        recall, reciprocal_rank, ndcg = score_ranking(results, eval_query.expected, k)
+        evaluations.append(
+            QueryEvaluation(
+                query=eval_query.query,
+                recall=recall,
+                reciprocal_rank=reciprocal_rank,
+                ndcg=ndcg,
+                latency_ms=latency * 1000,
+                peak_memory_mb=_get_allocated_memory_mb(search),
+            ),
+        )
+
+    index_files = (INDEX_VERSIONS_LOCATION / version).rglob("*")
+    config = {
+        "search": search_function.__name__,
+        "backend": embeddings.config.get("backend", "faiss"),
+        "first_stage": embeddings.config.get("twostage"),
+    }
+    return EvalRun(
+        name=name or f"{version} {search_function.__name__}",
+        created_at=datetime.now(UTC),
+        version=version,
+        model=get_manifest(version).model,
+        config=config,
+        k=k,
+        index_size_mb=sum(p.stat().st_size for p in index_files if p.is_file()) / 1e6,
+        load_memory_mb=load_memory,
+        queries=evaluations,
+    )
@@ -5,15 +5,31 @@ Search functions for the index.
 
 import json
 
-from typing import Type, TypeVar
+from typing import TYPE_CHECKING, Type, TypeVar
 
+from logos.config import Config
 from logos.data.index import get_or_create_index
+from logos.data.related import get_related_passages
 from logos.entities.query import QueryResult
 from logos.entities.text import TextChunk
 
 
+if TYPE_CHECKING:
+    from txtai.embeddings import Embeddings
+
+
 ReturnType = TypeVar("ReturnType", bound=QueryResult | TextChunk)
 
+SIMILARITY_QUERY = """
+    select id, data, score
+    from txtai
+    where similar(:query) and score > :min_score
+"""
+"""SQL query to search the index by similarity with a minimum score."""
+
+DEFAULT_SEARCH_LIMIT = 3
+"""Number of results returned by a search when no limit is given."""
+
 
 def _convert_result(data: dict, cls: Type[ReturnType]) -> ReturnType:
     """
@@ -30,6 +46,8 @@ def search_index(
     similarity_query: str,
     min_score: float = 0.0,
     limit: int | None = None,
+    *,
+    embeddings: "Embeddings | None" = None,
 ) -> list[QueryResult]:
     """
     Search the index with a query.
@@ -38,32 +56,104 @@ def search_index(
         similarity_query: Similarity query to search for.
         min_score: Minimum score to consider.
         limit: Maximum number of results to return.
+        embeddings: Index to search. If None, use the current index.
 
     Returns:
         List of text chunks.
     """
-    results: list[dict] = get_or_create_index().search(
-        query="""
-            select id, data, score
-            from txtai
-            where similar(:query) and score > :min_score
-        """,
-        limit=limit,
+    embeddings = get_or_create_index() if embeddings is None else embeddings
+    results: list[dict] = embeddings.search(
+        query=SIMILARITY_QUERY,
+        limit=limit or DEFAULT_SEARCH_LIMIT,
         parameters={"query": similarity_query, "min_score": min_score},
     )
     return [_convert_result(data, QueryResult) for data in results]
 
 
-def get_items_by_id(*ids: str) -> list[TextChunk]:
+def batch_search_index(
+    similarity_queries: list[str],
+    min_score: float = 0.0,
+    limit: int | None = None,
+    *,
+    embeddings: "Embeddings | None" = None,
+) -> list[list[QueryResult]]:
+    """
+    Search the index with many queries at once. All queries are encoded in a
+    single batch by the embedding model.
+
+    Args:
+        similarity_queries: Similarity queries to search for.
+        min_score: Minimum score to consider.
+        limit: Maximum number of results to return per query.
+        embeddings: Index to search. If None, use the current index.
+
+    Returns:
+        List of text chunks for each query, in the same order of the queries.
+    """
+    embeddings = get_or_create_index() if embeddings is None else embeddings
+    batch_results: list[list[dict]] = embeddings.batchsearch(
+        queries=[SIMILARITY_QUERY] * len(similarity_queries),
+        limit=limit or DEFAULT_SEARCH_LIMIT,
+        parameters=[
+            {"query": query, "min_score": min_score} for query in similarity_queries
+        ],
+    )
+    return [
+        [_convert_result(data, QueryResult) for data in results]
+        for results in batch_results
+    ]
+
+
+def get_items_by_id(
+    *ids: str,
+    embeddings: "Embeddings | None" = None,
+) -> list[TextChunk]:
     """
     Get items by their IDs.
     """
-    items: list[dict] = get_or_create_index().search(
-        query="""
+    if not ids:
+        return []
+    embeddings = get_or_create_index() if embeddings is None else embeddings
+    parameters = {f"id{i}": uid for i, uid in enumerate(ids)}
+    items: list[dict] = embeddings.search(
+        query=f"""
             select id, data
             from txtai
-            where id in (:ids_list)
-        """,
-        parameters={"ids_list": f"""'{"','".join(ids)}'"""},
+            where id in ({", ".join(f":{name}" for name in parameters)})
+        """,  # noqa: S608
+        limit=len(ids),
+        parameters=parameters,
     )
     return [_convert_result(data, TextChunk) for data in items]
+
+
+def get_related_items(
+    chunk_id: str,
+    limit: int | None = None,
+    *,
+    embeddings: "Embeddings | None" = None,
+) -> list[QueryResult]:
+    """
+    Get the passages most similar to a chunk, precomputed when indexing.
+
+    Args:
+        chunk_id: ID of the chunk to get related passages for.
+        limit: Maximum number of results to return. Defaults to all the
+            related passages precomputed per chunk.
+        embeddings: Index to search. If None, use the current index.
+
+    Returns:
+        List of related text chunks, scored by similarity.
+    """
+    embeddings = get_or_create_index() if embeddings is None else embeddings
+    related = get_related_passages(embeddings)
+    if related is None:
+        raise ValueError("The index has no related passages. Reset the index.")
+
+    scores = dict(related.get(chunk_id, [])[: limit or Config.RELATED_LIMIT])
+    chunks = {c.id: c for c in get_items_by_id(*scores, embeddings=embeddings)}
+    return [
+        QueryResult(text=chunks[uid], score=score)
+        for uid, score in scores.items()
+        if uid in chunks
+    ]
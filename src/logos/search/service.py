@@ -0,0 +1,320 @@
+"""
+Asynchronous search service to serve many concurrent queries.
+
+"""
+
+import asyncio
+import time
+
+from collections import defaultdict, deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from statistics import quantiles
+
+from pydantic import BaseModel
+
+from logos.entities.query import QueryResult
+
+
+QueryKey = tuple[str, float, int | None]
+"""Key identifying a query by its text, minimum score and limit."""
+
+LATENCY_WINDOW = 10_000
+"""Number of most recent request latencies used to compute percentiles."""
+
+MAX_SEARCH_LIMIT = 50
+"""
+Maximum number of results of a query. Every batch is searched with this limit,
+so the hybrid scores of a query do not depend on the other queries batched with
+it, and results are then cut to the limit of each query.
+"""
+
+
+class ServiceOverloadedError(RuntimeError):
+    """
+    Raised when the search service queue is full.
+    """
+
+
+class ServiceMetrics(BaseModel):
+    """
+    Snapshot of the search service metrics.
+    """
+
+    requests: int
+    coalesced: int
+    rejected: int
+    timeouts: int
+    failures: int
+    batches: int
+    mean_batch_size: float
+    queue_size: int
+    inflight: int
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+
+
+@dataclass
+class _PendingQuery:
+    """
+    Query waiting in the queue to be executed in a batch.
+    """
+
+    key: QueryKey
+    future: asyncio.Future
+    waiters: int = 0
+
+    @property
+    def limit(self) -> int:
+        """
+        Maximum number of results of the query.
+        """
+        from logos.search.index import DEFAULT_SEARCH_LIMIT
+
+        return self.key[2] or DEFAULT_SEARCH_LIMIT
+
+
+class SearchService:
+    """
+    Search service that micro-batches concurrent queries into a single encoder
+    forward pass and coalesces identical in-flight queries.
+
+    All index accesses run sequentially in a single background thread, keeping
+    the event loop free to accept requests while a batch is being executed.
+    Requests are rejected with `ServiceOverloadedError` when the queue is full
+    and with `TimeoutError` when not answered within the timeout.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        max_queue_size: int = 256,
+        timeout: float = 10.0,
+    ) -> None:
+        """
+        Args:
+            max_batch_size: Maximum number of queries to encode in a single batch.
+            max_wait: Maximum time in seconds to wait for a batch to be filled.
+            max_queue_size: Maximum number of queries waiting for execution.
+            timeout: Maximum time in seconds to answer a query.
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+
+        self._queue: asyncio.Queue[_PendingQuery] = asyncio.Queue(max_queue_size)
+        self._inflight: dict[QueryKey, _PendingQuery] = {}
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="logos-search")
+        self._worker: asyncio.Task | None = None
+
+        self._counters: dict[str, int] = defaultdict(int)
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self) -> None:
+        """
+        Load the index and start processing queued queries.
+        """
+        if self._worker is not None:
+            return
+
+        from logos.data.index import get_or_create_index
+
+        await self._run_in_executor(get_or_create_index)
+        self._worker = asyncio.create_task(self._process_queue())
+
+    async def stop(self) -> None:
+        """
+        Stop processing queued queries and release the background thread.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for pending in list(self._inflight.values()):
+            pending.future.cancel()
+        self._executor.shutdown(wait=True)
+
+    async def search(
+        self,
+        query: str,
+        min_score: float = 0.0,
+        limit: int | None = None,
+    ) -> list[QueryResult]:
+        """
+        Search the index with a query. Identical queries already waiting for
+        results share the same execution.
+
+        Args:
+            query: Similarity query to search for.
+            min_score: Minimum score to consider.
+            limit: Maximum number of results to return.
+
+        Returns:
+            List of text chunks.
+        """
+        if limit is not None and not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise ValueError(f"Limit must be between 1 and {MAX_SEARCH_LIMIT}.")
+
+        start = time.perf_counter()
+        self._counters["requests"] += 1
+
+        key = (query, min_score, limit)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._counters["coalesced"] += 1
+        else:
+            if self._queue.full():
+                self._counters["rejected"] += 1
+                raise ServiceOverloadedError(
+                    f"Search queue is full with {self._queue.qsize()} queries.",
+                )
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(lambda f: self._discard(key, f))
+            pending = _PendingQuery(key, future)
+            self._inflight[key] = pending
+            self._queue.put_nowait(pending)
+
+        # Keep the query queued while any of its callers is still waiting
+        pending.waiters += 1
+        try:
+            # Shield the shared future so a caller timeout does not cancel it
+            # for the other callers of a coalesced query.
+            return await asyncio.wait_for(
+                asyncio.shield(pending.future),
+                self.timeout,
+            )
+        except TimeoutError:
+            self._counters["timeouts"] += 1
+            raise
+        finally:
+            pending.waiters -= 1
+            self._latencies.append(time.perf_counter() - start)
+
+    async def related(
+        self,
+        chunk_id: str,
+        limit: int | None = None,
+    ) -> list[QueryResult]:
+        """
+        Get the precomputed related passages of a chunk. No query is encoded,
+        but the index is read in the same background thread as the searches,
+        so it waits for the batch being executed, if any.
+
+        Args:
+            chunk_id: ID of the chunk to get related passages for.
+            limit: Maximum number of results to return.
+
+        Returns:
+            List of related text chunks, scored by similarity.
+        """
+        from logos.search.index import get_related_items
+
+        return await self._run_in_executor(get_related_items, chunk_id, limit)
+
+    def metrics(self) -> ServiceMetrics:
+        """
+        Get a snapshot of the service metrics.
+        """
+        latencies = sorted(self._latencies)
+        if len(latencies) > 1:
+            percentiles = quantiles(latencies, n=100, method="inclusive")
+            p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0.0
+
+        batches = self._counters["batches"]
+        return ServiceMetrics(
+            requests=self._counters["requests"],
+            coalesced=self._counters["coalesced"],
+            rejected=self._counters["rejected"],
+            timeouts=self._counters["timeouts"],
+            failures=self._counters["failures"],
+            batches=batches,
+            mean_batch_size=self._counters["batched"] / batches if batches else 0.0,
+            queue_size=self._queue.qsize(),
+            inflight=len(self._inflight),
+            latency_p50_ms=p50 * 1000,
+            latency_p95_ms=p95 * 1000,
+            latency_p99_ms=p99 * 1000,
+        )
+
+    def _discard(self, key: QueryKey, future: asyncio.Future) -> None:
+        """
+        Remove a finished query from the in-flight queries. Its exception, if
+        any, is marked as retrieved, as all its callers may have timed out.
+        """
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()
+
+    async def _run_in_executor(self, func: Callable, *args: object) -> object:
+        """
+        Run a blocking function in the background thread.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _next_batch(self) -> list[_PendingQuery]:
+        """
+        Wait for the next query and gather up to `max_batch_size` queries that
+        arrive within `max_wait` seconds. Queries whose callers all timed out
+        are discarded, without any caller receiving the cancellation.
+
+        Note: Queries keep arriving while a batch is executed, so under load
+        batches are filled without waiting.
+        """
+        batch = [await self._queue.get()]
+        if self._queue.qsize() < self.max_batch_size - 1:
+            await asyncio.sleep(self.max_wait)
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        for pending in batch:
+            if not pending.waiters:
+                pending.future.cancel()
+        return [pending for pending in batch if not pending.future.done()]
+
+    async def _process_queue(self) -> None:
+        """
+        Execute queued queries in batches. Each batch is searched once with
+        `MAX_SEARCH_LIMIT` and the lowest minimum score among its queries, so
+        all queries are encoded in a single forward pass, and the results are
+        then cut to the limit and minimum score of each query.
+
+        Note: The fixed limit gathers the same dense and sparse candidates for
+        the hybrid scores of a query whatever the batch, so results may include
+        better scored chunks than a search with the limit of the query alone.
+        """
+        from logos.search.index import batch_search_index
+
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            self._counters["batches"] += 1
+            self._counters["batched"] += len(batch)
+
+            try:
+                results = await self._run_in_executor(
+                    batch_search_index,
+                    [pending.key[0] for pending in batch],
+                    min(pending.key[1] for pending in batch),
+                    MAX_SEARCH_LIMIT,
+                )
+            except Exception as exc:  # noqa: BLE001
+                self._counters["failures"] += len(batch)
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+                continue
+
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    min_score = pending.key[1]
+                    pending.future.set_result(
+                        [r for r in result if r.score > min_score][: pending.limit],
+                    )
@@ -0,0 +1,73 @@
+"""
+Tests for the conversion of documents into cleaned texts.
+
+"""
+
+import random
+import re
+
+import pytest
+
+from logos.data.convert import clean_text
+
+
+SEQUENTIAL_CLEANUP_RULES = [
+    (r"[\u00A0\t]", " "),
+    (r"[\(\[]\s*[\)\]]", ""),
+    (r"([\)\],.!?])(\w)", r"\1 \2"),
+    (r"(\w)([\(\[])", r"\1 \2"),
+    (r" +", " "),
+    (r"([\u2018\u201C\(\[]) ", r"\1"),
+    (r" ([\u2019\u201D\)\]])", r"\1"),
+    (r"[\u2018\u2019\u201C\u201D]", '"'),
+    (r"[\u201A\u201B]", "'"),
+    (r"\n([ ]+)", "\n"),
+    (r"([ ]+)\n", "\n"),
+    (r"\n([ ,.!?0-9]+)\n", "\n"),
+    (r"\n{3,}", "\n\n"),
+    (r" ([,.!?°º])", r"\1"),
+    (r"([,.!?°º])\1+", r"\1"),
+    (r"^[\d]+\n{2}", ""),
+    (r"\n{2}[\d]+$", ""),
+]
+"""Original cleaning rules, applied one by one in this order."""
+
+ALPHABET = "ab1 \n\t()[],.!?°º\u00a0\u2018\u2019\u201a\u201b\u201c\u201d"
+"""Characters that trigger the cleaning rules and their interactions."""
+
+
+def clean_text_sequentially(text: str) -> str:
+    """
+    Clean a text applying the original rules one by one.
+    """
+    for pattern, replacement in SEQUENTIAL_CLEANUP_RULES:
+        text = re.sub(pattern, replacement, text)
+    return text
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "12\n\nTexto  con\tespacios .Y puntos,,, repetidos!!\n\n\n\n34",
+        "Palabra( [ ] ) (  entre paréntesis )y[corchetes]fin.",
+        "\u201c Comillas \u201d y \u2018simples \u2019 con \u201aotras\u201b.",
+        "  inicio\n 1, 2. \n  \nfinal\u00a0 \n\n7",
+        "Número 3 °  y º .Grados ° ° º.",
+    ],
+)
+def test_clean_text_matches_sequential_rules(text: str) -> None:
+    """
+    Fused rules give the same result as the original rules on edge cases.
+    """
+    assert clean_text(text) == clean_text_sequentially(text)
+
+
+def test_clean_text_matches_sequential_rules_on_random_texts() -> None:
+    """
+    Fused rules give the same result as the original rules on random texts.
+    """
+    rng = random.Random(0)  # noqa: S311
+    for _ in range(20_000):
+        text = "".join(rng.choices(ALPHABET, k=rng.randint(0, 30)))
+        assert clean_text(text) == clean_text_sequentially(text), repr(text)
@@ -0,0 +1,99 @@
+"""
+Tests for the scoring of search results on labeled queries.
+
+"""
+
+import math
+
+import pytest
+
+from logos.entities.paragraph import ParagraphReference
+from logos.entities.query import QueryResult
+from logos.entities.source import Source, SourceType
+from logos.entities.text import TextChunk
+from logos.search.evaluation import ExpectedParagraph, score_ranking
+
+
+SOURCE = Source(title="Libro", type=SourceType.book, path="books/Libro.txt")
+"""Source of all the paragraphs of the tests."""
+
+
+def make_result(*paragraphs: int) -> QueryResult:
+    """
+    Create a result with a chunk containing the given paragraphs.
+    """
+    chunk = TextChunk(
+        id=f"chunk-{'-'.join(map(str, paragraphs))}",
+        text="Texto",
+        source=SOURCE,
+        paragraphs=[ParagraphReference(paragraph=p) for p in paragraphs],
+    )
+    return QueryResult(text=chunk, score=1.0)
+
+
+def make_expected(*paragraphs: int) -> list[ExpectedParagraph]:
+    """
+    Create the expected paragraphs of a query.
+    """
+    return [
+        ExpectedParagraph(source=SOURCE, paragraph=ParagraphReference(paragraph=p))
+        for p in paragraphs
+    ]
+
+
+@pytest.mark.parametrize(
+    "results",
+    [
+        [make_result(1, 2, 3)],
+        [make_result(1), make_result(2), make_result(3)],
+        [make_result(1, 2), make_result(3), make_result(4)],
+    ],
+)
+def test_perfect_ranking_scores_one(results: list[QueryResult]) -> None:
+    """
+    Rankings finding all paragraphs first score 1.0, however paragraphs are
+    grouped in chunks.
+    """
+    assert score_ranking(results, make_expected(1, 2, 3), k=10) == (1.0, 1.0, 1.0)
+
+
+def test_missing_paragraphs_lower_all_scores() -> None:
+    """
+    Paragraphs not found lower the recall and the nDCG, and the reciprocal
+    rank is the one of the first relevant result.
+    """
+    results = [make_result(4), make_result(1), make_result(5)]
+    recall, reciprocal_rank, ndcg = score_ranking(results, make_expected(1, 2), k=10)
+    assert recall == 0.5  # noqa: PLR2004
+    assert reciprocal_rank == 0.5  # noqa: PLR2004
+    assert ndcg == pytest.approx((1 / math.log2(3)) / (1 + 1 / math.log2(3)))
+
+
+def test_late_chunk_with_many_paragraphs_is_discounted() -> None:
+    """
+    A chunk with all the paragraphs found after irrelevant results is
+    discounted by its rank.
+    """
+    results = [make_result(4), make_result(5), make_result(1, 2, 3)]
+    recall, reciprocal_rank, ndcg = score_ranking(results, make_expected(1, 2, 3), k=10)
+    assert (recall, reciprocal_rank) == (1.0, 1 / 3)
+    assert ndcg == pytest.approx(0.5)
+
+
+def test_repeated_paragraphs_count_once() -> None:
+    """
+    A paragraph split in many chunks is only counted on its first chunk.
+    """
+    results = [make_result(1), make_result(1), make_result(2)]
+    recall, _, ndcg = score_ranking(results, make_expected(1, 2), k=10)
+    assert recall == 1.0
+    assert ndcg == pytest.approx((1 + 1 / 2) / (1 + 1 / math.log2(3)))
+
+
+def test_only_top_k_results_are_scored() -> None:
+    """
+    Results after the top k are ignored.
+    """
+    results = [make_result(4), make_result(1)]
+    assert score_ranking(results, make_expected(1), k=1) == (0.0, 0.0, 0.0)
+    assert score_ranking([make_result(1)], [], k=1) == (0.0, 0.0, 0.0)
@@ -0,0 +1,164 @@
+"""
+Tests for the micro-batching search service.
+
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from logos.entities.query import QueryResult
+from logos.search.service import (
+    MAX_SEARCH_LIMIT,
+    SearchService,
+    ServiceOverloadedError,
+)
+
+
+class FakeIndex:
+    """
+    Fake batch search that records its calls and returns one result per score.
+    """
+
+    def __init__(self, delay: float = 0.0) -> None:
+        """
+        Args:
+            delay: Time in seconds each batch search takes.
+        """
+        self.delay = delay
+        self.calls: list[tuple[list[str], float, int]] = []
+
+    def __call__(
+        self,
+        queries: list[str],
+        min_score: float,
+        limit: int,
+    ) -> list[list[QueryResult]]:
+        """
+        Search a batch of queries, with the signature of `batch_search_index`.
+        """
+        self.calls.append((queries, min_score, limit))
+        time.sleep(self.delay)
+        scores = [0.9, 0.7, 0.5, 0.3, 0.1]
+        return [
+            [QueryResult.model_construct(text=query, score=s) for s in scores]
+            for query in queries
+        ]
+
+
+@pytest.fixture()
+def fake_index(monkeypatch: pytest.MonkeyPatch) -> FakeIndex:
+    """
+    Replace the index loading and the batch search by a fake index.
+    """
+    fake_index = FakeIndex()
+    monkeypatch.setattr("logos.data.index.get_or_create_index", lambda: None)
+    monkeypatch.setattr("logos.search.index.batch_search_index", fake_index)
+    return fake_index
+
+
+def test_batches_are_searched_with_a_fixed_limit(fake_index: FakeIndex) -> None:
+    """
+    Concurrent queries are searched in one batch with the maximum limit and
+    results are cut to the limit and minimum score of each query.
+    """
+
+    async def run() -> list[list[QueryResult]]:
+        service = SearchService(max_wait=0.05)
+        await service.start()
+        try:
+            return await asyncio.gather(
+                service.search("a", limit=1),
+                service.search("b", min_score=0.4),
+                service.search("c", min_score=0.2, limit=4),
+            )
+        finally:
+            await service.stop()
+
+    results = asyncio.run(run())
+    assert fake_index.calls == [(["a", "b", "c"], 0.0, MAX_SEARCH_LIMIT)]
+    assert [[r.score for r in result] for result in results] == [
+        [0.9],
+        [0.9, 0.7, 0.5],
+        [0.9, 0.7, 0.5, 0.3],
+    ]
+
+
+def test_identical_queries_are_coalesced(fake_index: FakeIndex) -> None:
+    """
+    Identical queries waiting for results share the same execution.
+    """
+
+    async def run() -> list[list[QueryResult]]:
+        service = SearchService(max_wait=0.05)
+        await service.start()
+        try:
+            results = await asyncio.gather(*[service.search("a") for _ in range(3)])
+            assert service.metrics().coalesced == 2  # noqa: PLR2004
+            return results
+        finally:
+            await service.stop()
+
+    results = asyncio.run(run())
+    assert fake_index.calls == [(["a"], 0.0, MAX_SEARCH_LIMIT)]
+    assert results[0] == results[1] == results[2]
+
+
+def test_queries_are_rejected_when_the_queue_is_full(fake_index: FakeIndex) -> None:
+    """
+    Queries beyond the queue size are rejected while the queue is full.
+    """
+
+    async def run() -> None:
+        service = SearchService(max_wait=0.05, max_queue_size=2)
+        await service.start()
+        try:
+            accepted = [asyncio.create_task(service.search(q)) for q in "ab"]
+            await asyncio.sleep(0)
+            with pytest.raises(ServiceOverloadedError):
+                await service.search("c")
+            await asyncio.gather(*accepted)
+            assert service.metrics().rejected == 1
+        finally:
+            await service.stop()
+
+    asyncio.run(run())
+    assert fake_index.calls == [(["a", "b"], 0.0, MAX_SEARCH_LIMIT)]
+
+
+def test_timed_out_queries_are_dropped(fake_index: FakeIndex) -> None:
+    """
+    Callers not answered within the timeout receive a `TimeoutError`, and
+    queries without callers left are not searched.
+    """
+    fake_index.delay = 0.2
+
+    async def run() -> None:
+        service = SearchService(max_wait=0.0, timeout=0.1)
+        await service.start()
+        try:
+            running = asyncio.create_task(service.search("a"))
+            await asyncio.sleep(0.01)
+            with pytest.raises(TimeoutError):
+                await service.search("b")
+            with pytest.raises(TimeoutError):
+                await running
+            await asyncio.sleep(0.2)
+            assert service.metrics().timeouts == 2  # noqa: PLR2004
+            assert service.metrics().inflight == 0
+        finally:
+            await service.stop()
+
+    asyncio.run(run())
+    assert fake_index.calls == [(["a"], 0.0, MAX_SEARCH_LIMIT)]
+
+
+def test_limit_must_be_within_the_maximum(fake_index: FakeIndex) -> None:
+    """
+    Queries with a limit above the maximum are refused before being queued.
+    """
+    service = SearchService()
+    with pytest.raises(ValueError, match="Limit"):
+        asyncio.run(service.search("a", limit=MAX_SEARCH_LIMIT + 1))
+    assert not fake_index.calls